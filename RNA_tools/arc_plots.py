@@ -0,0 +1,95 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+
+from pair_tables import base_pairs
+
+# Points per arc polyline
+ARC_RESOLUTION = 32
+
+def arc_segments(pairs, resolution=ARC_RESOLUTION):
+    """
+    Upper half-ellipses for all pairs at once, as an array of shape
+    (n_pairs, resolution, 2) ready for a LineCollection. Same geometry as
+    patches.Arc(((i + j) / 2, 0), width=j - i, height=(j - i) / 2).
+    """
+    if len(pairs) == 0:
+        return np.zeros((0, resolution, 2))
+    p = np.asarray(pairs, dtype=float)
+    center = (p[:, 0] + p[:, 1]) / 2
+    span = p[:, 1] - p[:, 0]
+    theta = np.linspace(0, np.pi, resolution)
+    x = center[:, None] + (span[:, None] / 2) * np.cos(theta)[None, :]
+    y = (span[:, None] / 4) * np.sin(theta)[None, :]
+    return np.stack([x, y], axis=-1)
+
+def draw_arc_plot(ax, ss, sequence, max_labels=60, title="RNA Secondary Structure Arc Plot"):
+    """
+    Draw an arc plot on `ax`: one line for the backbone, one collection for all arcs.
+    Above `max_labels` nucleotides only every k-th position is labelled.
+    """
+    n = len(sequence)
+    ax.plot(range(n), [0] * n, 'o-', color='gray', markersize=2 if n <= 300 else 0.5, lw=0.5)
+    ax.add_collection(LineCollection(arc_segments(base_pairs(ss)), colors='blue', linewidths=1))
+
+    step = max(1, math.ceil(n / max_labels))
+    ticks = range(0, n, step)
+    ax.set_yticks([])
+    ax.set_xticks(ticks)
+    if step == 1:
+        ax.set_xticklabels(list(sequence))
+    else:
+        ax.set_xticklabels([f"{sequence[i]}{i + 1}" for i in ticks], rotation=90, fontsize=6)
+    ax.set_xlim(-1, n)
+    ax.set_ylim(-5, max(n / 2, 5))
+    ax.set_aspect('equal')
+    ax.set_title(title)
+
+def render_arc_plot(ss, sequence, output_path, max_labels=60, title="RNA Secondary Structure Arc Plot", dpi=100):
+    """
+    Save an arc plot to output_path (.png, .svg, .pdf ... by extension).
+    Uses a standalone Agg canvas, so no GUI backend or pyplot state is involved.
+    """
+    width = min(max(6.4, len(sequence) / 25), 30)
+    fig = Figure(figsize=(width, 4.8))
+    FigureCanvasAgg(fig)
+    draw_arc_plot(fig.add_subplot(), ss, sequence, max_labels, title)
+    fig.savefig(output_path, dpi=dpi)
+    return output_path
+
+def _render_job(args):
+    ss, sequence, output_path = args
+    return render_arc_plot(ss, sequence, output_path)
+
+def render_arc_plots(items, workers=None):
+    """
+    Render many plots. items: iterable of (ss, sequence, output_path).
+    workers: None or 1 renders in this process, N > 1 uses N processes.
+    Returns the output paths in input order.
+    """
+    items = list(items)
+    if workers is None or workers <= 1:
+        return [_render_job(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_job, items, chunksize=max(1, len(items) // (workers * 4))))
+
+def render_arc_report(items, output_path, ncols=3, max_labels=30, dpi=100):
+    """
+    Draw many structures as panels of a single figure.
+    items: iterable of (ss, sequence, title).
+    """
+    items = list(items)
+    nrows = max(1, math.ceil(len(items) / ncols))
+    fig = Figure(figsize=(5 * ncols, 3.5 * nrows))
+    FigureCanvasAgg(fig)
+    for k, (ss, sequence, title) in enumerate(items):
+        draw_arc_plot(fig.add_subplot(nrows, ncols, k + 1), ss, sequence, max_labels, title)
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    fig.savefig(output_path, dpi=dpi)
+    return output_path
@@ -0,0 +1,256 @@
+"""
+Headless, resumable batch runs: design -> 3D model -> analysis for many
+scaffolds, seeds and candidate counts without any dialog.
+
+Every finished design, model and analysis is appended to a checkpoint
+manifest (<out-root>/manifest.jsonl). Run the same command again after a
+crash and the work already recorded there is skipped. 3D models go through
+a durable job queue (<out-root>/model_jobs.sqlite, see modeling_backends)
+with retries, backoff and an optional rate limit.
+
+    python batch_runner.py --scaffolds z_tile_tetramer triangular_prism --seeds 1 2 3 --counts 5
+    python batch_runner.py --out-root overnight --fake-composer 2.0   # offline, against FakeRNAComposer
+"""
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import create_rna_data as cr
+import process_rna_data as prd
+import rnacomposer
+import instrumentation
+import modeling_backends
+from candidate_store import CandidateStore
+from ensemble_filter import EnsembleFilter
+
+# =========================
+# 1. Checkpoint manifest
+# =========================
+
+class Manifest:
+    """
+    Append-only JSON-lines log of completed work, one event per line:
+      {"job": id, "stage": "design", "candidates": [...], "prefilter": {...}}
+      {"job": id, "stage": "model", "index": i, "path": ...}
+      {"job": id, "stage": "analysis", "index": i, "records": [...]}
+      {"job": id, "stage": "done", "best": {...}}
+    Each line is flushed to disk before the next piece of work starts; a
+    torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a")
+
+    def job(self, job_id):
+        return self.jobs.setdefault(job_id, {"candidates": None, "prefilter": None, "models": {}, "analyses": {},
+                                             "best": None, "done": False})
+
+    def _apply(self, event):
+        job = self.job(event["job"])
+        stage = event["stage"]
+        if stage == "design":
+            job["candidates"] = event["candidates"]
+            job["prefilter"] = event.get("prefilter")
+        elif stage == "model":
+            job["models"][event["index"]] = event["path"]
+        elif stage == "analysis":
+            job["analyses"][event["index"]] = event["records"]
+        elif stage == "done":
+            job["best"] = event["best"]
+            job["done"] = True
+
+    def record(self, job_id, stage, **fields):
+        event = dict(job=job_id, stage=stage, **fields)
+        line = json.dumps(event)
+        with self._lock:
+            self._apply(event)
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+# =========================
+# 2. One job
+# =========================
+
+def job_id(scaffold_name, seed, n_candidates):
+    return f"{scaffold_name}/seed{seed}_n{n_candidates}"
+
+def run_job(manifest, store, scaffold_name, seed, n_candidates, args):
+    """
+    Design, model and analyse one (scaffold, seed, n_candidates) combination,
+    skipping whatever the manifest already holds.
+    """
+    jid = job_id(scaffold_name, seed, n_candidates)
+    job = manifest.job(jid)
+    if job["done"]:
+        print(f"[{jid}] already done, skipping")
+        return job["best"]
+    job_dir = os.path.join(args.out_root, scaffold_name, f"seed{seed}_n{n_candidates}")
+
+    # design
+    if job["candidates"] is None:
+        t0 = time.perf_counter()
+        candidates = cr.generate_candidates_for_scaffold(scaffold_name, n_candidates, rng_seed=seed,
+                                                         workers=args.workers, engine=args.engine,
+                                                         dedup=cr.Deduplicator(args.max_hamming))
+        # keyed by job id: a crash before the manifest line below does not duplicate the rows on rerun
+        cr.save_candidates(scaffold_name, candidates, store=store, run=jid)
+        print(f"[{jid}] designed {len(candidates)} candidates in {time.perf_counter() - t0:.1f} s")
+        prefilter = None
+        if args.top_k is not None or args.min_probability is not None or args.max_defect is not None:
+            ef = EnsembleFilter(args.top_k, args.min_probability, args.max_defect, workers=args.workers)
+            candidates = ef.apply(candidates)
+            prefilter = ef.report()
+            ef.print_report()
+        manifest.record(jid, "design", candidates=candidates, prefilter=prefilter)
+    candidates = job["candidates"]
+
+    # 3D models through the job queue, up to max_in_flight at a time; each one is checkpointed as it lands
+    pdb_dir = os.path.join(job_dir, "pdb_files")
+    todo = [i for i in range(1, len(candidates) + 1)
+            if not (job["models"].get(i) and os.path.exists(job["models"][i]))]
+    if todo:
+        queue, backend = args.queue, args.backend
+        ids = {}
+        for i in todo:
+            candidate = candidates[i - 1]
+            rc_input = cr.write_rnacomposer_input(candidate["sequence"], candidate["predicted_ss"])
+            ids[queue.submit(rc_input, os.path.join(pdb_dir, f"new_RNA_{i}.pdb"), backend.name)] = i
+        finished = [queue.job(qid) for qid in ids if queue.job(qid)["status"] == modeling_backends.DONE]
+        for model_job in itertools.chain(finished, queue.run({backend.name: backend}, job_ids=ids)):
+            i = ids[model_job["id"]]
+            if model_job["status"] != modeling_backends.DONE:
+                # not recorded, so the next run tries again
+                print(f"[{jid}] model {i} failed after {model_job['attempts']} attempts: {model_job['error']}")
+                continue
+            manifest.record(jid, "model", index=i, path=model_job["out_path"])
+            print(f"[{jid}] model {i} saved to {model_job['out_path']}")
+
+    # analysis of every model not analysed yet
+    todo = [(i, path) for i, path in sorted(job["models"].items()) if i not in job["analyses"]]
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.analysis_workers) as pool:
+            futures = {
+                pool.submit(prd._analyze_job,
+                            (path, os.path.join(job_dir, "analysis", f"output_{os.path.basename(path)}"),
+                             not args.no_plots, None)): i
+                for i, path in todo
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                records = prd.observe_records(future.result())
+                manifest.record(jid, "analysis", index=i, records=records)
+
+    if len(job["analyses"]) < len(candidates):
+        print(f"[{jid}] {len(candidates) - len(job['analyses'])} candidates still missing, rerun to retry them")
+        return None
+    records = [r for i in sorted(job["analyses"]) for r in job["analyses"][i]]
+    best = prd.most_stable(records)
+    manifest.record(jid, "done", best=best)
+    if best is not None:
+        print(f"[{jid}] most stable: {best['file']} chain {best['chain']} (MFE: {best['mfe']:.2f})")
+    return best
+
+# =========================
+# 3. Command line
+# =========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scaffolds", nargs="+", help="scaffold names (default: every registered scaffold)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[42])
+    parser.add_argument("--counts", type=int, nargs="+", default=[5], help="candidates per design run")
+    parser.add_argument("--out-root", default="batch_runs")
+    parser.add_argument("--manifest", help="checkpoint manifest (default: <out-root>/manifest.jsonl)")
+    parser.add_argument("--store", help="candidate store for all designs (default: <out-root>/candidates.rcs)")
+    parser.add_argument("--engine", choices=["inverse_fold", "local_search"], default="inverse_fold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="design and scoring processes")
+    parser.add_argument("--max-hamming", type=int,
+                        help="also drop designs within this Hamming distance of an earlier one")
+    parser.add_argument("--top-k", type=int, help="model only the K candidates with the lowest ensemble defect")
+    parser.add_argument("--min-probability", type=float,
+                        help="model only candidates whose target structure has at least this Boltzmann probability")
+    parser.add_argument("--max-defect", type=float, help="model only candidates with at most this ensemble defect")
+    parser.add_argument("--analysis-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", choices=sorted(modeling_backends.BACKENDS), default="rnacomposer",
+                        help="3D-modeling backend")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="concurrent modeling jobs")
+    parser.add_argument("--rate-limit", type=float, metavar="PER_MINUTE", help="modeling job starts per minute")
+    parser.add_argument("--max-attempts", type=int, default=4, help="attempts per model before giving up")
+    parser.add_argument("--queue", help="modeling job queue (default: <out-root>/model_jobs.sqlite)")
+    parser.add_argument("--timeout", type=float, default=600, help="per-model limit in seconds")
+    parser.add_argument("--base-url", default=rnacomposer.RNACOMPOSER_URL)
+    parser.add_argument("--fake-composer", type=float, metavar="DELAY",
+                        help="model against a local FakeRNAComposer taking DELAY seconds per job")
+    parser.add_argument("--no-plots", action="store_true", help="skip arc plots in the analysis")
+    parser.add_argument("--metrics", metavar="DIR", help="write instrumentation reports to DIR")
+    args = parser.parse_args(argv)
+
+    registry = cr.get_default_registry()
+    scaffolds = args.scaffolds or registry.names()
+    unknown = [name for name in scaffolds if name not in registry]
+    if unknown:
+        parser.error(f"unknown scaffolds: {', '.join(unknown)}")
+    if args.metrics:
+        instrumentation.enable()
+
+    server = None
+    if args.fake_composer is not None:
+        from fake_rnacomposer import FakeRNAComposer
+        server = FakeRNAComposer(delay=args.fake_composer).start()
+        args.base_url = server.url
+
+    backend_kwargs = {"max_concurrency": args.max_in_flight, "rate_per_minute": args.rate_limit,
+                      "timeout": args.timeout}
+    if args.backend == "rnacomposer":
+        backend_kwargs.update(base_url=args.base_url, cache=cr.get_default_cache())
+    args.backend = modeling_backends.make_backend(args.backend, **backend_kwargs)
+    args.queue = modeling_backends.JobQueue(args.queue or os.path.join(args.out_root, "model_jobs.sqlite"),
+                                            max_attempts=args.max_attempts)
+
+    manifest = Manifest(args.manifest or os.path.join(args.out_root, "manifest.jsonl"))
+    store = CandidateStore(args.store or os.path.join(args.out_root, "candidates.rcs"))
+    results = {}
+    try:
+        for scaffold_name, seed, n_candidates in itertools.product(scaffolds, args.seeds, args.counts):
+            results[job_id(scaffold_name, seed, n_candidates)] = run_job(manifest, store, scaffold_name, seed,
+                                                                         n_candidates, args)
+    finally:
+        manifest.close()
+        store.close()
+        args.queue.close()
+        if server is not None:
+            server.stop()
+        if args.metrics:
+            instrumentation.write_reports(args.metrics)
+
+    finished = sum(best is not None for best in results.values())
+    print(f"{finished}/{len(results)} jobs complete; manifest at {manifest.path}")
+    reports = [manifest.job(jid)["prefilter"] for jid in results if manifest.job(jid)["prefilter"]]
+    if reports:
+        skipped = sum(r["skipped"] for r in reports)
+        saved = sum(r["modeling_seconds_saved"] for r in reports)
+        print(f"Ensemble filter skipped {skipped} of {sum(r['considered'] for r in reports)} models "
+              f"(~{saved / 60:.0f} min of modeling saved)")
+    return 0 if finished == len(results) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+"""
+Benchmark: global, span-limited and local folding across sequence lengths.
+
+Folds random sequences of each length in every mode of
+fold_service.FoldPolicy and reports the wall time and the peak memory of
+the fold (each one in a fresh process, so memory is not shared between
+measurements), next to the policy's predictions. For each non-global fold
+the base-pair distance to the global structure shows what the cheaper
+mode gives up.
+
+    python bench_fold_modes.py [--lengths 500 1000 2000 4000 8000] [--max-global 4000]
+"""
+import argparse
+import multiprocessing
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import RNA
+
+import fold_service
+
+def measure(sequence, mode, max_bp_span, window):
+    # runs in its own process: the peak RSS growth is the memory of this fold
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    service = fold_service.FoldService()
+    t0 = time.perf_counter()
+    if mode == "local":
+        structure, mfe = service.fold(sequence, window=window)
+    elif mode == "span":
+        structure, mfe = service.fold(sequence, max_bp_span=max_bp_span)
+    else:
+        structure, mfe = service.fold(sequence)
+    seconds = time.perf_counter() - t0
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024
+    return structure, mfe, seconds, peak_mb
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000])
+    parser.add_argument("--max-global", type=int, default=4000, help="longest sequence also folded globally")
+    parser.add_argument("--max-bp-span", type=int, default=300)
+    parser.add_argument("--window", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policy = fold_service.FoldPolicy(max_bp_span=args.max_bp_span, window=args.window)
+    context = multiprocessing.get_context("spawn")
+    rng = random.Random(args.seed)
+    print(f"{'nt':>6}  {'mode':<10}{'time (s)':>10}{'pred (s)':>10}{'peak MB':>9}{'pred MB':>9}{'MFE':>10}"
+          f"{'bp dist':>9}")
+    for n in args.lengths:
+        sequence = "".join(rng.choice("ACGU") for _ in range(n))
+        reference = None
+        for mode in fold_service.FOLD_MODES:
+            if mode == "global" and n > args.max_global:
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                structure, mfe, seconds, peak_mb = pool.submit(measure, sequence, mode, args.max_bp_span,
+                                                               args.window).result()
+            if mode == "global":
+                reference = structure
+            predicted_s, predicted_mb = policy.estimate(mode, n)
+            distance = RNA.bp_distance(reference, structure) if reference and mode != "global" else "-"
+            print(f"{n:>6}  {policy.label(mode):<10}{seconds:>10.2f}{predicted_s:>10.2f}{peak_mb:>9.0f}"
+                  f"{predicted_mb:>9.0f}{mfe:>10.1f}{distance:>9}")
@@ -0,0 +1,106 @@
+"""
+Benchmark: per-chain sequence extraction from PDB / mmCIF files.
+
+Writes synthetic all-atom RNA structures of increasing size, checks that the
+streaming reader, gemmi and Biopython return the same chain sequences, and
+times each of them.
+
+    python bench_structure_parsing.py [--sizes 200 2000 20000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from structure_sequences import READERS
+
+BACKBONE = ["P", "OP1", "OP2", "O5'", "C5'", "C4'", "O4'", "C3'", "O3'", "C2'", "O2'", "C1'"]
+BASE_ATOMS = {
+    "A": ["N9", "C8", "N7", "C5", "C6", "N6", "N1", "C2", "N3", "C4"],
+    "G": ["N9", "C8", "N7", "C5", "C6", "O6", "N1", "C2", "N2", "N3", "C4"],
+    "C": ["N1", "C2", "O2", "N3", "C4", "N4", "C5", "C6"],
+    "U": ["N1", "C2", "O2", "N3", "C4", "O4", "C5", "C6"],
+}
+
+def synthetic_chains(n_residues, n_chains, rng):
+    per_chain = max(1, n_residues // n_chains)
+    return {chr(ord("A") + i): "".join(rng.choice("AUGC") for _ in range(per_chain))
+            for i in range(n_chains)}
+
+def _atoms(chains):
+    serial = 0
+    for chain, sequence in chains.items():
+        for resseq, base in enumerate(sequence, start=1):
+            for name in BACKBONE + BASE_ATOMS[base]:
+                serial += 1
+                yield serial, name, base, chain, resseq
+        # a few waters per chain, which must not count as residues
+        for k in range(3):
+            serial += 1
+            yield serial, "O", "HOH", chain, 1000 + k
+
+def write_pdb(path, chains):
+    with open(path, "w") as f:
+        for serial, name, resname, chain, resseq in _atoms(chains):
+            record = "HETATM" if resname == "HOH" else "ATOM  "
+            atom = f" {name:<3s}" if len(name) < 4 else name
+            f.write(f"{record}{serial % 100000:5d} {atom} {resname:>3s} {chain}{resseq:4d}    "
+                    f"{serial % 97:8.3f}{serial % 89:8.3f}{serial % 83:8.3f}  1.00  0.00          {name[0]:>2s}\n")
+        f.write("END   \n")
+
+def write_cif(path, chains):
+    columns = ["group_PDB", "id", "type_symbol", "label_atom_id", "label_alt_id", "label_comp_id",
+               "label_asym_id", "label_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y", "Cartn_z",
+               "occupancy", "B_iso_or_equiv", "auth_seq_id", "auth_comp_id", "auth_asym_id",
+               "auth_atom_id", "pdbx_PDB_model_num"]
+    with open(path, "w") as f:
+        f.write("data_bench\n#\nloop_\n")
+        for column in columns:
+            f.write(f"_atom_site.{column}\n")
+        for serial, name, resname, chain, resseq in _atoms(chains):
+            group = "HETATM" if resname == "HOH" else "ATOM"
+            atom = f'"{name}"' if "'" in name else name
+            f.write(f"{group} {serial} {name[0]} {atom} . {resname} {chain} {resseq} ? "
+                    f"{serial % 97:.3f} {serial % 89:.3f} {serial % 83:.3f} 1.00 0.00 "
+                    f"{resseq} {resname} {chain} {atom} 1\n")
+        f.write("#\n")
+
+def time_reader(reader, path, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = reader(path)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000], help="residues per file")
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    methods = ["stream", "gemmi", "biopython"]
+    print(f"{'format':<7}{'residues':>10}{'MB':>8}" + "".join(f"{m + ' (s)':>16}" for m in methods))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            chains = synthetic_chains(size, args.chains, rng)
+            for ext, writer in ((".pdb", write_pdb), (".cif", write_cif)):
+                path = os.path.join(tmp, f"bench_{size}{ext}")
+                writer(path, chains)
+                row = f"{ext[1:]:<7}{size:>10}{os.path.getsize(path) / 1e6:>8.1f}"
+                for method in methods:
+                    try:
+                        elapsed, result = time_reader(READERS[method], path, args.repeat)
+                    except ImportError:
+                        row += f"{'n/a':>16}"
+                        continue
+                    if result != chains:
+                        raise SystemExit(f"{method} returned different sequences for {path}")
+                    row += f"{elapsed:>16.4f}"
+                print(row)
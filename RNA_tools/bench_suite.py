@@ -0,0 +1,194 @@
+"""
+Benchmark suite for the design, analysis and plotting hot paths.
+
+Runs offline with fixed seeds:
+  - design: generate_candidates_for_scaffold on every registered scaffold
+    at several candidate counts
+  - parse:  extract_chain_sequences and analyze_structure_file on synthetic
+    PDB / mmCIF fixtures of increasing size
+  - plot:   plot_arc_diagram at 50 / 300 / 1000 nt
+  - demo:   the phased demo.py flow, with RNAComposer replaced by
+    FakeRNAComposer and Mol*Star by FakeMolstarDriver
+
+Results are written as a JSON baseline; --compare prints the change against
+an earlier baseline and exits with status 1 if any benchmark got slower
+than --threshold.
+
+    python bench_suite.py [--stages design parse plot demo] [--out benchmarks/latest.json]
+    python bench_suite.py --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+import RNA
+
+import create_rna_data as cr
+import demo
+import fold_service
+import process_rna_data as prd
+import rna_visualizer as rv
+from bench_structure_parsing import synthetic_chains, write_pdb, write_cif
+from fake_molstar import FakeMolstarDriver
+from fake_rnacomposer import FakeRNAComposer
+from structure_sequences import extract_chain_sequences
+
+STAGES = ["design", "parse", "plot", "demo"]
+
+def reset_caches():
+    # every measurement starts cold, so memoized folds do not hide regressions
+    fold_service.configure()
+    fold_service.bp_distance.cache_clear()
+
+def measure(fn, repeat):
+    """
+    Run fn() `repeat` times from cold caches.
+    Returns ({"seconds": best, "mean": mean, "repeat": repeat}, last result).
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        reset_caches()
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return {"seconds": min(times), "mean": sum(times) / len(times), "repeat": repeat}, result
+
+# =========================
+# 1. Stages
+# =========================
+
+def bench_design(args, results):
+    for name in cr.get_default_registry().names():
+        for n in args.counts:
+            entry, candidates = measure(
+                lambda: cr.generate_candidates_for_scaffold(name, n, rng_seed=args.seed), args.design_repeat)
+            entry["best_bp_distance"] = min((c["bp_distance"] for c in candidates), default=None)
+            results[f"design/{name}/n={n}"] = entry
+
+def bench_parse(args, results, tmp):
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        chains = synthetic_chains(size, 4, rng)
+        for ext, writer in ((".pdb", write_pdb), (".cif", write_cif)):
+            path = os.path.join(tmp, f"fixture_{size}{ext}")
+            writer(path, chains)
+            entry, _ = measure(lambda: extract_chain_sequences(path), args.repeat)
+            entry["bytes"] = os.path.getsize(path)
+            results[f"parse/{ext[1:]}/{size}"] = entry
+            if size <= args.max_fold_residues:
+                out_dir = os.path.join(tmp, f"analysis_{size}{ext[1:]}")
+                entry, _ = measure(lambda: prd.analyze_structure_file(path, out_dir, plot=False, verbose=False),
+                                   args.repeat)
+                results[f"analyze/{ext[1:]}/{size}"] = entry
+
+def bench_plot(args, results, tmp):
+    rng = random.Random(args.seed)
+    for n in args.plot_lengths:
+        sequence = "".join(rng.choice("AUGC") for _ in range(n))
+        ss, _ = RNA.fold(sequence)
+        path = os.path.join(tmp, f"arc_{n}.png")
+        entry, _ = measure(lambda: prd.plot_arc_diagram(ss, sequence, path), args.repeat)
+        results[f"plot/{n}"] = entry
+
+def bench_demo(args, results, tmp):
+    workdir = os.path.join(tmp, "demo")
+    os.makedirs(workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with FakeRNAComposer(delay=args.composer_delay) as server:
+            def flow():
+                top1 = demo.run_phased(args.demo_scaffold, args.demo_candidates, base_url=server.url, cache=False)
+                rv.represent(top1["file"], driver=FakeMolstarDriver())
+                return top1
+            entry, top1 = measure(flow, 1)
+        entry["best_mfe"] = top1["mfe"]
+        results[f"demo/{args.demo_scaffold}/n={args.demo_candidates}"] = entry
+    finally:
+        os.chdir(cwd)
+
+# =========================
+# 2. Baselines
+# =========================
+
+def compare(old, new, threshold):
+    """
+    Print old vs new times per benchmark. Returns the keys that got slower than threshold.
+    """
+    slower = []
+    print(f"{'benchmark':<44}{'old (s)':>10}{'new (s)':>10}{'change':>9}")
+    for key in sorted(set(old) | set(new)):
+        if key not in old or key not in new:
+            print(f"{key:<44}{'only in ' + ('new' if key in new else 'old'):>29}")
+            continue
+        a, b = old[key]["seconds"], new[key]["seconds"]
+        change = (b - a) / a if a else 0.0
+        flag = ""
+        if change > threshold:
+            slower.append(key)
+            flag = "  slower"
+        print(f"{key:<44}{a:>10.4f}{b:>10.4f}{change:>+9.1%}{flag}")
+    return slower
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "latest.json"))
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--design-repeat", type=int, default=1)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 5], help="candidate counts for the design stage")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000], help="fixture sizes in residues")
+    parser.add_argument("--max-fold-residues", type=int, default=2000,
+                        help="largest fixture that is also folded by analyze_structure_file")
+    parser.add_argument("--plot-lengths", type=int, nargs="+", default=[50, 300, 1000])
+    parser.add_argument("--demo-scaffold", default="z_tile_tetramer")
+    parser.add_argument("--demo-candidates", type=int, default=3)
+    parser.add_argument("--composer-delay", type=float, default=0.5, help="seconds the fake RNAComposer takes per job")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for stage in args.stages:
+            print(f"Running {stage} benchmarks...")
+            if stage == "design":
+                bench_design(args, results)
+            elif stage == "parse":
+                bench_parse(args, results, tmp)
+            elif stage == "plot":
+                bench_plot(args, results, tmp)
+            else:
+                bench_demo(args, results, tmp)
+
+    baseline = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "viennarna": getattr(RNA, "__version__", "unknown"),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        slower = compare(old, results, args.threshold)
+        if slower:
+            raise SystemExit(f"{len(slower)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(slower)}")
+    else:
+        for key, entry in results.items():
+            print(f"{key:<44}{entry['seconds']:>10.4f} s")
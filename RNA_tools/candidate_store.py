@@ -0,0 +1,305 @@
+"""
+Append-only, columnar store for designed candidates.
+
+Candidates of one design run share their scaffold-level metadata (target
+structure, motif configuration, annotation); it is written once as a
+group. Per candidate only the sequence, predicted structure, MFE,
+base-pair distance and motif flag are stored.
+
+Two files:
+  <path>        data, one text line per group ("G\\t<json>") or candidate
+                ("C\\t<group>\\t<sequence>\\t<structure>\\t<mfe>\\t<distance>\\t<intact>")
+  <path>.idx    fixed-width binary index, one record per data line, with the
+                numeric columns and the line's byte offset
+
+Opening a store reads only the index, with one np.fromfile call, plus the
+few group lines. Filters and top-k queries run on the index columns, and
+sequences are read from the data file only for the rows asked for.
+
+Only the numeric columns are array-backed. Sequences and structures stay
+variable-length text in the data file: candidates of different scaffolds
+differ in length, and fixed-width byte columns would pad every row to
+the longest one. filter() and top_k() never read them. get() seeks to
+and parses just the requested lines.
+
+    store = CandidateStore("designs.rcs")
+    store.add_candidates("z_tile_tetramer", candidates)
+    best = store.get(store.top_k(10, store.filter(max_distance=0)))
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+INDEX_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("kind", "u1"),
+    ("intact", "?"),
+    ("group", "<i4"),
+    ("bp_distance", "<i4"),
+    ("mfe", "<f4"),
+])
+
+GROUP = 1
+CANDIDATE = 0
+
+class CandidateStore:
+    """
+    Args:
+        path (str): data file; the index lives next to it as <path>.idx
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._data = open(path, "ab+")
+        self._index_file = open(self.index_path, "ab")
+        self._load()
+
+    # =========================
+    # Loading
+    # =========================
+
+    def _load(self):
+        data_size = os.path.getsize(self.path)
+        n_records, torn = divmod(os.path.getsize(self.index_path), INDEX_DTYPE.itemsize)
+        if torn:
+            # torn last index record
+            self._truncate_index(n_records)
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE, count=n_records)
+        if len(index) and index["offset"][-1] + index["length"][-1] > data_size:
+            # index records whose data line never made it to disk
+            keep = int(np.searchsorted(index["offset"] + index["length"], data_size, side="right"))
+            index = index[:keep]
+            self._truncate_index(keep)
+        self._index = index
+        self._n = len(index)
+        self.groups = []
+        for offset, length in zip(index["offset"][index["kind"] == GROUP], index["length"][index["kind"] == GROUP]):
+            group = json.loads(self._read_line(int(offset), int(length))[2:])
+            # JSON object keys are strings; loop indices are ints
+            group["motifs"] = {int(k): v for k, v in group["motifs"].items()}
+            self.groups.append(group)
+        self._refresh_views()
+
+    def _truncate_index(self, n_records):
+        self._index_file.close()
+        with open(self.index_path, "r+b") as f:
+            f.truncate(n_records * INDEX_DTYPE.itemsize)
+        self._index_file = open(self.index_path, "ab")
+
+    def _refresh_views(self):
+        # rebuilt on the next query rather than after every append
+        self._view = None
+
+    @property
+    def _candidates(self):
+        if self._view is None:
+            rows = self._index[: self._n]
+            self._view = rows[rows["kind"] == CANDIDATE]
+        return self._view
+
+    def _read_line(self, offset, length):
+        self._data.seek(offset)
+        return self._data.read(length).decode("ascii").rstrip("\n")
+
+    # =========================
+    # Writing
+    # =========================
+
+    def _append(self, lines, records):
+        """
+        Write data lines, then their index records. Both files only grow.
+        """
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            blob = "".join(lines).encode("ascii")
+            lengths = np.fromiter((len(line) for line in lines), dtype=np.int64, count=len(lines))
+            records["length"] = lengths
+            records["offset"] = offset + np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            self._data.write(blob)
+            self._data.flush()
+            self._index_file.write(records.tobytes())
+            self._index_file.flush()
+
+            needed = self._n + len(records)
+            if needed > len(self._index):
+                grown = np.zeros(max(needed, 2 * len(self._index), 1024), dtype=INDEX_DTYPE)
+                grown[: self._n] = self._index[: self._n]
+                self._index = grown
+            self._index[self._n:needed] = records
+            self._n = needed
+            self._refresh_views()
+
+    def _new_group(self, group_id, scaffold_name, target_ss, motifs=None, annotation=None, run=None):
+        return {
+            "id": group_id,
+            "scaffold": scaffold_name,
+            "target_ss": target_ss,
+            "motifs": {int(k): v for k, v in (motifs or {}).items()},
+            "annotation": annotation,
+            "run": run,
+        }
+
+    def _group_rows(self, group):
+        records = np.zeros(1, dtype=INDEX_DTYPE)
+        records["kind"] = GROUP
+        records["group"] = group["id"]
+        return ["G\t" + json.dumps(group, separators=(",", ":")) + "\n"], records
+
+    def _candidate_rows(self, group_id, candidates):
+        records = np.zeros(len(candidates), dtype=INDEX_DTYPE)
+        records["kind"] = CANDIDATE
+        records["group"] = group_id
+        records["mfe"] = [c["mfe"] for c in candidates]
+        records["bp_distance"] = [c["bp_distance"] for c in candidates]
+        records["intact"] = [c.get("motifs_intact", True) for c in candidates]
+        lines = [f"C\t{group_id}\t{c['sequence']}\t{c['predicted_ss']}\t{float(c['mfe'])!r}\t{c['bp_distance']}\t"
+                 f"{int(c.get('motifs_intact', True))}\n" for c in candidates]
+        return lines, records
+
+    def add_group(self, scaffold_name, target_ss, motifs=None, annotation=None, run=None):
+        """
+        Store scaffold-level metadata once. Returns the group id.
+        """
+        group = self._new_group(len(self.groups), scaffold_name, target_ss, motifs, annotation, run)
+        self._append(*self._group_rows(group))
+        self.groups.append(group)
+        return group["id"]
+
+    def append(self, group_id, candidates):
+        """
+        Append candidate dicts (sequence, predicted_ss, mfe, bp_distance,
+        motifs_intact) to an existing group.
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return
+        self._append(*self._candidate_rows(group_id, candidates))
+
+    def add_candidates(self, scaffold_name, candidates, run=None):
+        """
+        Store the output of generate_candidates_for_scaffold: one group per
+        distinct motif configuration, then the candidates, in one append.
+        `run` (e.g. a batch job id) makes this idempotent: a run already in
+        the store is not written again, so a retried job adds no duplicates.
+        Returns the group ids used.
+        """
+        if run is not None and run in self.runs():
+            return [g["id"] for g in self.groups if g.get("run") == run]
+        groups = []
+        batches = {}
+        for c in candidates:
+            key = id(c["motifs"])
+            if key not in batches:
+                group = self._new_group(len(self.groups) + len(groups), scaffold_name, c["target_ss"], c["motifs"],
+                                        c.get("annotation"), run)
+                groups.append(group)
+                batches[key] = (group["id"], [])
+            batches[key][1].append(c)
+        if not groups:
+            return []
+        rows = [self._group_rows(group) for group in groups]
+        rows += [self._candidate_rows(group_id, batch) for group_id, batch in batches.values()]
+        self._append([line for lines, _ in rows for line in lines], np.concatenate([records for _, records in rows]))
+        self.groups.extend(groups)
+        return [group["id"] for group in groups]
+
+    def runs(self):
+        """
+        The run ids stored with add_candidates(run=...).
+        """
+        return {g["run"] for g in self.groups if g.get("run") is not None}
+
+    # =========================
+    # Queries
+    # =========================
+
+    def __len__(self):
+        return len(self._candidates)
+
+    @property
+    def mfe(self):
+        return self._candidates["mfe"]
+
+    @property
+    def bp_distance(self):
+        return self._candidates["bp_distance"]
+
+    @property
+    def motifs_intact(self):
+        return self._candidates["intact"]
+
+    @property
+    def group(self):
+        return self._candidates["group"]
+
+    def filter(self, max_distance=None, max_mfe=None, intact=None, scaffold=None, groups=None):
+        """
+        Candidate numbers (0 .. len-1) matching every given condition.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if max_distance is not None:
+            mask &= self.bp_distance <= max_distance
+        if max_mfe is not None:
+            mask &= self.mfe <= max_mfe
+        if intact is not None:
+            mask &= self.motifs_intact == intact
+        if scaffold is not None:
+            groups = [g["id"] for g in self.groups if g["scaffold"] == scaffold]
+        if groups is not None:
+            mask &= np.isin(self.group, list(groups))
+        return np.nonzero(mask)[0]
+
+    def top_k(self, k, rows=None):
+        """
+        The k best candidates by (bp_distance, mfe), optionally among `rows`.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        if len(rows) > k:
+            # cheap partial selection on a combined key, then an exact sort of the survivors
+            score = self.bp_distance[rows].astype(np.float64) * 1e6 + self.mfe[rows]
+            rows = rows[np.argpartition(score, k - 1)[:k]]
+        order = np.lexsort((self.mfe[rows], self.bp_distance[rows]))
+        return rows[order]
+
+    def get(self, rows):
+        """
+        Candidate dicts for the given candidate numbers, in that order.
+        Motifs and annotation are shared with the group, not copied.
+        """
+        rows = np.atleast_1d(np.asarray(rows))
+        records = self._candidates[rows]
+        out = []
+        with self._lock:
+            for rec in records:
+                _, group, sequence, structure, mfe, distance, intact = \
+                    self._read_line(int(rec["offset"]), int(rec["length"])).split("\t")
+                g = self.groups[int(group)]
+                out.append({
+                    "sequence": sequence,
+                    "predicted_ss": structure,
+                    "target_ss": g["target_ss"],
+                    "mfe": float(mfe),
+                    "bp_distance": int(distance),
+                    "motifs": g["motifs"],
+                    "annotation": g["annotation"],
+                    "motifs_intact": intact == "1",
+                    "scaffold": g["scaffold"],
+                })
+        return out
+
+    def close(self):
+        self._data.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
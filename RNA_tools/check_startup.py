@@ -0,0 +1,67 @@
+"""
+Startup-time check for the modules that design and analysis workers import.
+
+Each module is imported in a fresh interpreter (best of --repeat runs). The
+check fails if an import takes longer than its budget or loads any of the
+heavy GUI / browser / plotting / parsing dependencies, which must only be
+loaded by the feature that needs them.
+
+    python check_startup.py [--repeat 5] [--scale 2.0]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Seconds per import on a developer machine; --scale loosens them for slow hosts
+IMPORT_BUDGETS = {
+    "create_rna_data": 0.35,
+    "process_rna_data": 0.25,
+    "fold_service": 0.15,
+    "rnacomposer": 0.10,
+}
+
+HEAVY_MODULES = ["selenium", "easygui", "tkinter", "gemmi", "requests", "matplotlib", "Bio"]
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+def probe(module, repeat):
+    """
+    Best import time of `module` in fresh interpreters, and the heavy modules it loaded.
+    """
+    best = None
+    heavy = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        heavy = result["heavy"]
+    return best, heavy
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this factor")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<20}{'import (s)':>12}{'budget (s)':>12}  heavy modules loaded")
+    for module, budget in IMPORT_BUDGETS.items():
+        budget *= args.scale
+        seconds, heavy = probe(module, args.repeat)
+        print(f"{module:<20}{seconds:>12.3f}{budget:>12.3f}  {', '.join(heavy) or '-'}")
+        if seconds > budget:
+            failures.append(f"{module} took {seconds:.3f} s (budget {budget:.3f} s)")
+        if heavy:
+            failures.append(f"{module} loaded {', '.join(heavy)}")
+    if failures:
+        raise SystemExit("Startup check failed:\n  " + "\n  ".join(failures))
+    print("Startup check passed")
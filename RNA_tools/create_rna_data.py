@@ -1,16 +1,17 @@
 import os
+import math
 import random
 import RNA  # ViennaRNA Python bindings
-import subprocess
-import pathlib
-import easygui as eg
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
-import gemmi
-import requests
+import numpy as np
+import rnacomposer
+import fold_service
+import instrumentation
+import webdriver_pool
+from pair_tables import pair_table
+from scaffold_registry import get_default_registry, TETRALOOPS
+from model_cache import get_default_cache
+from concurrent.futures import ProcessPoolExecutor
 
 # =========================
 # 1. Scaffolds (yours)
@@ -27,6 +28,19 @@ scaffold = {
     "rool_repeat_unit": "(((....)))........(((....)))........(((....)))........(((....)))",
 }
 
+# Loops (by index) that may be paired as kissing loops; one pattern is drawn per run
+KISSING_PATTERNS = {
+    "z_tile_tetramer": [
+        [(0, 1), (2, 3)],
+        [(0, 2), (1, 3)],
+        [(0, 3), (1, 2)],
+    ],
+    # opposite loops kissing
+    "tetrahedron_wireframe": [[(0, 2), (1, 3)]],
+    # top (0, 1, 2) vs bottom (3, 4, 5) loops
+    "triangular_prism": [[(0, 3), (1, 4), (2, 5)]],
+}
+
 NUCS = ["A", "U", "G", "C"]
 
 # =========================
@@ -58,55 +72,35 @@ def find_hairpin_loops(dot_bracket: str):
 # 3. Motif config sampling
 # =========================
 
-def sample_motif_configuration(scaffold_name: str, loops: list, rng=None):
+def sample_motif_configuration(scaffold_name: str, loops: list = None, rng=None):
     """
-    Choose which loops get which motif type.
+    Choose which loops get which motif type: one of the scaffold's kissing
+    patterns (KISSING_PATTERNS, or the registry entry) and a GNRA or UUCG
+    tetraloop on every other loop. For a registered scaffold whose loops
+    are not given (or match its own) the draw goes through the registry
+    (CompiledScaffold.sample). Otherwise `loops` decides: only the kissing
+    patterns that fit them are used, and a scaffold with no patterns gets
+    tetraloops everywhere.
     Returns: dict keyed by loop index (0,1,2,...) with entries like:
       {"type": "GNRA"} or {"type": "kissing", "pair_with": 2}
     """
     if rng is None:
         rng = random.Random()
-
-    n_loops = len(loops)
-    config = {i: {"type": None} for i in range(n_loops)}
-
-    if scaffold_name == "z_tile_tetramer":
-        # 4 loops: choose a kissing pairing pattern among a few options
-        if n_loops != 4:
-            return config  # fallback
-
-        patterns = [
-            [(0, 1), (2, 3)],
-            [(0, 2), (1, 3)],
-            [(0, 3), (1, 2)],
-        ]
-        pairs = rng.choice(patterns)
-        for a, b in pairs:
-            config[a] = {"type": "kissing", "pair_with": b}
-            config[b] = {"type": "kissing", "pair_with": a}
-
-    elif scaffold_name == "tetrahedron_wireframe":
-        # Opposite loops kissing: (0<->2, 1<->3)
-        if n_loops >= 4:
-            config[0] = {"type": "kissing", "pair_with": 2}
-            config[2] = {"type": "kissing", "pair_with": 0}
-            config[1] = {"type": "kissing", "pair_with": 3}
-            config[3] = {"type": "kissing", "pair_with": 1}
-
-    elif scaffold_name == "triangular_prism":
-        # Top (0,1,2) vs bottom (3,4,5) loops, pair them if present
-        if n_loops >= 6:
-            for top, bottom in zip(range(0, 3), range(3, 6)):
-                config[top] = {"type": "kissing", "pair_with": bottom}
-                config[bottom] = {"type": "kissing", "pair_with": top}
-
-    # For any loop not assigned kissing, assign a stabilizing tetraloop motif
-    for i in range(n_loops):
-        if config[i]["type"] is None:
-            # randomly choose GNRA or UUCG
-            config[i] = {"type": random.choice(["GNRA", "UUCG"])}
-
-    return config
+    registry = get_default_registry()
+    patterns = KISSING_PATTERNS.get(scaffold_name, [])
+    if scaffold_name in registry:
+        compiled = registry.get(scaffold_name)
+        if loops is None or [tuple(loop) for loop in loops] == compiled.loops:
+            return compiled.sample(rng)[0]
+        patterns = compiled.kissing_patterns
+    elif loops is None:
+        raise ValueError(f"Scaffold {scaffold_name} is not registered; pass its loops")
+
+    patterns = [p for p in patterns if all(i < len(loops) for pair in p for i in pair)]
+    pattern = rng.choice(patterns) if patterns else []
+    partner = {a: b for pair in pattern for a, b in (pair, pair[::-1])}
+    return {i: {"type": "kissing", "pair_with": partner[i]} if i in partner else {"type": rng.choice(list(TETRALOOPS))}
+            for i in range(len(loops))}
 
 # =========================
 # 4. Motifs -> constraints + annotation
@@ -230,16 +224,42 @@ def build_initial_sequence(length, constraints, rng=None):
             seq.append(rng.choice(NUCS))
     return "".join(seq)
 
+def fix_constrained_positions(sequence, constraints):
+    """
+    Lowercase every constrained position (fewer than four allowed bases).
+    RNA.inverse_fold never mutates lowercase positions of its start sequence,
+    so the motifs survive the design as they were drawn.
+    """
+    seq = list(sequence)
+    for i, allowed in constraints.items():
+        if len(allowed) < len(NUCS):
+            seq[i] = seq[i].lower()
+    return "".join(seq)
+
+def motifs_intact(sequence, constraints):
+    """
+    True if every position of `sequence` holds one of its allowed bases.
+    """
+    sequence = sequence.upper()
+    return all(sequence[i] in allowed for i, allowed in constraints.items())
+
 
 # =========================
 # 6. 
 # =========================
 
-def inverse_fold_with_constraints(target_ss, constraints, n_tries=10, rng=None):
+def inverse_fold_with_constraints(target_ss, constraints, n_tries=10, rng=None, deadline=None, stats=None):
     """
     Try multiple times to design a sequence whose MFE structure matches target_ss
     as closely as possible, given base constraints.
-    Returns: best (sequence, predicted_ss, mfe, bp_distance)
+    deadline: optional time.time() after which no new try is started
+        (at least one try always runs)
+    stats: optional dict; stats["tries"] is increased by the number of
+        inverse_fold + fold rounds used, stats["rejected"] by the number of
+        designs thrown away (without folding them) for breaking a motif
+    Constrained positions are fixed during inverse folding.
+    Returns: best (sequence, predicted_ss, mfe, bp_distance), or None if
+        every try broke a motif
     """
     if rng is None:
         rng = random.Random()
@@ -247,17 +267,28 @@ def inverse_fold_with_constraints(target_ss, constraints, n_tries=10, rng=None):
     best = None
     best_dist = None
 
-    for _ in range(n_tries):
+    for k in range(n_tries):
+        if k > 0 and deadline is not None and time.time() >= deadline:
+            break
+        if stats is not None:
+            stats["tries"] = stats.get("tries", 0) + 1
         # 1) build an initial sequence that respects constraints
         init_seq = build_initial_sequence(len(target_ss), constraints, rng)
 
-        # 2) run inverse folding from ViennaRNA
+        # 2) run inverse folding from ViennaRNA, with the motif positions fixed
         # NOTE: depending on your ViennaRNA version, inverse_fold signature may differ.
-        designed_seq, _ = RNA.inverse_fold(init_seq, target_ss)
+        with instrumentation.span("inverse_fold"):
+            designed_seq, _ = RNA.inverse_fold(fix_constrained_positions(init_seq, constraints), target_ss)
+        designed_seq = designed_seq.upper()
+        if not motifs_intact(designed_seq, constraints):
+            if stats is not None:
+                stats["rejected"] = stats.get("rejected", 0) + 1
+            instrumentation.count("designs_rejected")
+            continue
 
         # 3) refold the designed sequence to see what it actually does
-        pred_ss, mfe = RNA.fold(designed_seq)
-        dist = RNA.bp_distance(target_ss, pred_ss)
+        pred_ss, mfe = fold_service.fold(designed_seq)
+        dist = fold_service.bp_distance(target_ss, pred_ss)
 
         if best is None or dist < best_dist:
             best = (designed_seq, pred_ss, mfe, dist)
@@ -270,14 +301,464 @@ def inverse_fold_with_constraints(target_ss, constraints, n_tries=10, rng=None):
     return best  # (sequence, predicted_ss, mfe, bp_distance)
 
 
+PAIRS = ["GC", "CG", "AU", "UA", "GU", "UG"]
+# Watson-Crick pairs are drawn first; GU only where the constraints leave nothing else
+STRONG_PAIRS = PAIRS[:4]
+
+# Full folds per local-search "try", so n_tries means the same effort scale for both engines
+LOCAL_SEARCH_STEPS = 20
+
+def _allowed(constraints, pos):
+    return constraints.get(pos, NUCS)
+
+def _pair_options(constraints, i, j, exclude=None):
+    options = [p for p in PAIRS
+               if p[0] in _allowed(constraints, i) and p[1] in _allowed(constraints, j) and p != exclude]
+    strong = [p for p in options if p in STRONG_PAIRS]
+    return strong or options
+
+def compatible_sequence(target_ss, constraints, rng=None, start_seq=None):
+    """
+    Return a sequence that respects the constraints and can form every base
+    pair of target_ss: paired positions get a complementary (or GU) pair
+    drawn from what both positions allow. Starts from start_seq if given.
+    """
+    if rng is None:
+        rng = random.Random()
+    pt = pair_table(target_ss)
+    seq = list((start_seq or build_initial_sequence(len(target_ss), constraints, rng)).upper())
+    for i, base in enumerate(seq):
+        if base not in _allowed(constraints, i):
+            seq[i] = rng.choice(_allowed(constraints, i))
+    for i, j in enumerate(pt.tolist()):
+        if j > i and seq[i] + seq[j] not in STRONG_PAIRS:
+            options = _pair_options(constraints, i, j)
+            if options:
+                seq[i], seq[j] = rng.choice(options)
+    return "".join(seq)
+
+def _propose_mutation(seq, pos, target_pt, constraints, rng):
+    """
+    Mutate `pos` (and its target partner, to keep the pair) within the constraints.
+    Returns the new sequence, or None if the position is fixed.
+    """
+    seq = list(seq)
+    partner = int(target_pt[pos])
+    if partner >= 0:
+        options = _pair_options(constraints, pos, partner, exclude=seq[pos] + seq[partner])
+        if not options:
+            return None
+        seq[pos], seq[partner] = rng.choice(options)
+    else:
+        options = [b for b in _allowed(constraints, pos) if b != seq[pos]]
+        if not options:
+            return None
+        seq[pos] = rng.choice(options)
+    return "".join(seq)
+
+def local_search_design(target_ss, constraints, start_seq=None, max_steps=200, n_proposals=8,
+                        rng=None, deadline=None, stats=None):
+    """
+    Improve one sequence by targeted mutations instead of restarting from scratch.
+
+    Each step looks at the positions where the current MFE structure differs
+    from target_ss. Spurious pairs are ranked by ViennaRNA's move evaluation
+    (fc.eval_move, the energy needed to open the pair) on the current
+    sequence's fold compound, so the most stable wrong pairs are attacked
+    first. `n_proposals` mutations at those positions, always compatible with
+    the constraints and keeping target pairs complementary, are scored by
+    the energy gap E(target) - E(current structure), a linear-time
+    evaluation. Only the best proposal gets a full fold. It is accepted if the
+    base-pair distance does not get worse.
+
+    stats: optional dict; stats["tries"] counts full folds.
+    Returns: best (sequence, predicted_ss, mfe, bp_distance)
+    """
+    if rng is None:
+        rng = random.Random()
+    service = fold_service.get_fold_service()
+    target_pt = pair_table(target_ss)
+    mutable = {i for i in range(len(target_ss))
+               if len(_allowed(constraints, i)) > 1
+               or (target_pt[i] >= 0 and len(_allowed(constraints, int(target_pt[i]))) > 1)}
+
+    def full_fold(seq):
+        if stats is not None:
+            stats["tries"] = stats.get("tries", 0) + 1
+        ss, mfe = service.fold(seq)
+        return ss, mfe, fold_service.bp_distance(target_ss, ss)
+
+    seq = compatible_sequence(target_ss, constraints, rng, start_seq)
+    pred_ss, mfe, dist = full_fold(seq)
+    energy_gap = service.fold_compound(seq).eval_structure(target_ss) - mfe
+    best = (seq, pred_ss, mfe, dist)
+
+    for _ in range(max_steps):
+        if dist == 0 or (deadline is not None and time.time() >= deadline):
+            break
+        current_pt = pair_table(pred_ss)
+        positions = np.nonzero(current_pt != target_pt)[0]
+        if positions.size == 0:
+            break
+
+        # weight wrong pairs by how much energy it takes to open them; a pair
+        # between fixed bases is attacked through its neighbours instead
+        fc = service.fold_compound(seq)
+        weights = {}
+        for pos in positions.tolist():
+            partner = int(current_pt[pos])
+            weight = 1.0
+            if partner >= 0:
+                i, j = sorted((pos, partner))
+                weight += max(fc.eval_move(pred_ss, -(i + 1), -(j + 1)), 0.0)
+            sites = [pos] if pos in mutable else [p for p in (pos - 1, pos + 1) if p in mutable]
+            for site in sites:
+                weights[site] = max(weights.get(site, 0.0), weight)
+        if not weights:
+            break
+
+        best_move = None
+        for pos in rng.choices(list(weights), weights=list(weights.values()), k=n_proposals):
+            new_seq = _propose_mutation(seq, pos, target_pt, constraints, rng)
+            if new_seq is None:
+                continue
+            fc_eval = service.fold_compound(new_seq, RNA.OPTION_EVAL_ONLY)
+            target_energy = fc_eval.eval_structure(target_ss)
+            gap = target_energy - fc_eval.eval_structure(pred_ss)
+            if best_move is None or gap < best_move[0]:
+                best_move = (gap, new_seq, target_energy)
+        if best_move is None:
+            continue
+
+        _, new_seq, target_energy = best_move
+        new_ss, new_mfe, new_dist = full_fold(new_seq)
+        # accept fewer wrong pairs, or a target closer in energy to the MFE
+        # (the gap can shrink while the distance still goes up, which lets
+        # the search leave local minima of the distance)
+        new_gap = target_energy - new_mfe
+        if new_dist < dist or new_gap < energy_gap or (new_dist == dist and new_gap == energy_gap):
+            seq, pred_ss, mfe, dist, energy_gap = new_seq, new_ss, new_mfe, new_dist, new_gap
+            if dist < best[3] or (dist == best[3] and mfe < best[2]):
+                best = (seq, pred_ss, mfe, dist)
+
+    return best
+
+
 # =========================
 # 7. 
 # =========================
 
+def _design_trial(args):
+    """
+    Run a single design trial with its own RNG stream.
+    Used by both the serial and the process-pool path so that a given
+    trial seed always yields the same design, whichever process runs it.
+    args: (target_ss, constraints, n_tries, seed[, deadline[, engine]])
+    engine: "inverse_fold" (default) or "local_search"
+    Returns (result, tries used).
+    """
+    target_ss, constraints, n_tries, seed = args[:4]
+    deadline = args[4] if len(args) > 4 else None
+    engine = args[5] if len(args) > 5 else "inverse_fold"
+    # ViennaRNA keeps its own random state for inverse_fold; reseed it per trial
+    RNA.init_rand(seed)
+    stats = {"tries": 0}
+    if engine == "local_search":
+        result = local_search_design(target_ss, constraints, max_steps=n_tries * LOCAL_SEARCH_STEPS - 1,
+                                     rng=random.Random(seed), deadline=deadline, stats=stats)
+        # report tries, not folds, so budgets mean the same for both engines
+        stats["tries"] = math.ceil(stats["tries"] / LOCAL_SEARCH_STEPS)
+    else:
+        result = inverse_fold_with_constraints(target_ss, constraints, n_tries=n_tries, rng=random.Random(seed),
+                                               deadline=deadline, stats=stats)
+    return result, stats["tries"]
+
+
+def _prepare_scaffold(scaffold_name, rng):
+    """
+    Steps shared by every design mode: loops, motif configuration, constraints.
+    The loops, kissing patterns and constraint templates come precompiled
+    from the scaffold registry; only the random motif draw happens here.
+    Returns (dot_bracket, motif_cfg, constraints, annotation).
+    """
+    compiled = get_default_registry().get(scaffold_name)
+    motif_cfg, constraints, annotation = compiled.sample(rng)
+    return compiled.dot_bracket, motif_cfg, constraints, annotation
+
+
+def _make_candidate(result, db, motif_cfg, annotation, constraints):
+    seq, pred_ss, mfe, dist = result
+    return {
+        "sequence": seq,
+        "predicted_ss": pred_ss,
+        "target_ss": db,
+        "mfe": mfe,
+        "bp_distance": dist,
+        "motifs": motif_cfg,
+        "annotation": annotation,
+        "motifs_intact": motifs_intact(seq, constraints),
+    }
+
+
+class Deduplicator:
+    """
+    Drops designs already seen in a run.
+
+    Args:
+        max_hamming (int): if set, a design whose sequence is within this
+            Hamming distance of an earlier one (same length) also counts as
+            a duplicate; None only removes exact (sequence, predicted_ss) repeats
+
+    `removed` counts the duplicates dropped so far.
+    """
+
+    def __init__(self, max_hamming=None):
+        self.max_hamming = max_hamming
+        self.removed = 0
+        self._seen = set()
+        self._kept = {}
+
+    def is_new(self, candidate):
+        """
+        Remember `candidate` and return True, or count it and return False if it is a duplicate.
+        """
+        key = (candidate["sequence"], candidate["predicted_ss"])
+        duplicate = key in self._seen
+        if not duplicate and self.max_hamming is not None:
+            encoded = np.frombuffer(candidate["sequence"].encode("ascii"), dtype=np.uint8)
+            kept = self._kept.get(len(encoded))
+            if kept:
+                distances = (np.vstack(kept) != encoded).sum(axis=1)
+                duplicate = bool((distances <= self.max_hamming).any())
+            if not duplicate:
+                self._kept.setdefault(len(encoded), []).append(encoded)
+        if duplicate:
+            self.removed += 1
+            instrumentation.count("duplicates_removed")
+            return False
+        self._seen.add(key)
+        return True
+
+    def print_report(self):
+        kind = "duplicate" if self.max_hamming is None else f"duplicate or near-duplicate (Hamming <= {self.max_hamming})"
+        print(f"Removed {self.removed} {kind} designs")
+
+
+def iter_candidates_for_scaffold(
+    scaffold_name: str,
+    n_candidates: int = 5,
+    rng_seed: int = 42,
+    workers: int = None,
+    engine: str = "inverse_fold",
+    dedup: Deduplicator = None,
+    mp_context=None,
+):
+    """
+    Design trials for one scaffold, yielded one candidate dict at a time in
+    trial order as soon as each trial finishes (unranked).
+    Uses the same per-trial seeds as generate_candidates_for_scaffold, and
+    stops the remaining trials if the caller stops iterating.
+    engine: "inverse_fold" or "local_search" (see _design_trial)
+    dedup: Deduplicator for the run (default: exact repeats only). Every
+        trial that lands on a duplicate is replaced by a new trial, in
+        waves after the first round, up to as many extra trials as the
+        first round had; duplicates are not yielded.
+    mp_context: multiprocessing context of the worker pool, e.g.
+        get_context("spawn") when called from a thread of a multi-threaded
+        program, where forked workers could inherit held locks
+    """
+    if dedup is None:
+        dedup = Deduplicator()
+    rng = random.Random(rng_seed)
+    db, motif_cfg, constraints, annotation = _prepare_scaffold(scaffold_name, rng)
+
+    # oversample a bit so we can pick the best n_candidates
+    n_trials = max(n_candidates * 3, n_candidates)
+    replacements = n_trials
+
+    pool = None
+    if workers is not None and workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+
+    try:
+        wave = n_trials
+        while wave:
+            # one independent RNG stream per trial
+            trials = [(db, constraints, 5, rng.getrandbits(32), None, engine) for _ in range(wave)]
+            if pool is None:
+                results = map(_design_trial, trials)
+            else:
+                # map keeps trial order, so ties are broken exactly as in a serial run
+                results = pool.map(_design_trial, trials, chunksize=max(1, wave // (workers * 4)))
+            duplicates = 0
+            for result, tries in results:
+                instrumentation.count("design_trials", engine=engine)
+                instrumentation.count("design_tries", tries, engine=engine)
+                if result is None:
+                    continue
+                candidate = _make_candidate(result, db, motif_cfg, annotation, constraints)
+                if not dedup.is_new(candidate):
+                    duplicates += 1
+                    continue
+                yield candidate
+            wave = min(duplicates, replacements)
+            replacements -= wave
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+class DesignBudget:
+    """
+    Stopping rules for a budgeted design run, and a record of what was used.
+
+    Args:
+        target_good (int): stop once this many designs meet the quality bar
+            (default: n_candidates of the run)
+        max_distance (int): quality bar on bp_distance
+        max_mfe (float): optional quality bar on MFE (kcal/mol)
+        max_seconds (float): cap on wall time
+        max_folds (int): cap on inverse_fold + fold rounds
+        max_trials (int): cap on trials (default: n_candidates * 3)
+        min_tries, max_tries (int): range for the adaptive tries per trial
+        window (int): number of recent trials used to estimate the success rate
+
+    The number of tries given to each new trial is chosen from the recent
+    per-try success rate q: enough tries that a trial succeeds with 90 %
+    probability, i.e. log(0.1) / log(1 - q), clamped to [min_tries, max_tries].
+    """
+
+    def __init__(self, target_good=None, max_distance=0, max_mfe=None, max_seconds=None,
+                 max_folds=None, max_trials=None, min_tries=1, max_tries=10, window=20):
+        self.target_good = target_good
+        self.max_distance = max_distance
+        self.max_mfe = max_mfe
+        self.max_seconds = max_seconds
+        self.max_folds = max_folds
+        self.max_trials = max_trials
+        self.min_tries = min_tries
+        self.max_tries = max_tries
+        self.window = window
+
+        self.started = None
+        self.elapsed = 0.0
+        self.trials = 0
+        self.folds = 0
+        self.good = 0
+        self.stop_reason = None
+        self._recent = []
+
+    def start(self, n_candidates):
+        if self.target_good is None:
+            self.target_good = n_candidates
+        if self.max_trials is None:
+            self.max_trials = max(n_candidates * 3, n_candidates)
+        self.started = time.time()
+
+    @property
+    def deadline(self):
+        if self.max_seconds is None:
+            return None
+        return self.started + self.max_seconds
+
+    def is_good(self, candidate):
+        if not candidate["motifs_intact"] or candidate["bp_distance"] > self.max_distance:
+            return False
+        return self.max_mfe is None or candidate["mfe"] <= self.max_mfe
+
+    def record(self, candidate, tries):
+        self.trials += 1
+        self.folds += tries
+        good = candidate is not None and self.is_good(candidate)
+        self.good += good
+        self._recent = (self._recent + [(good, tries)])[-self.window:]
+        self.elapsed = time.time() - self.started
+
+    def exhausted(self):
+        """
+        Return the reason to stop, or None to keep going.
+        """
+        self.elapsed = time.time() - self.started
+        if self.good >= self.target_good:
+            self.stop_reason = "quality target reached"
+        elif self.trials >= self.max_trials:
+            self.stop_reason = "trial limit"
+        elif self.max_folds is not None and self.folds >= self.max_folds:
+            self.stop_reason = "fold limit"
+        elif self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            self.stop_reason = "time limit"
+        else:
+            return None
+        return self.stop_reason
+
+    def next_tries(self):
+        tries = self.max_tries
+        used = sum(t for _, t in self._recent)
+        if used:
+            q = sum(g for g, _ in self._recent) / used
+            if q >= 1:
+                tries = self.min_tries
+            elif q > 0:
+                tries = math.ceil(math.log(0.1) / math.log(1 - q))
+        if self.max_folds is not None:
+            tries = min(tries, self.max_folds - self.folds)
+        return max(self.min_tries, min(tries, self.max_tries))
+
+    def report(self):
+        return {
+            "stop_reason": self.stop_reason,
+            "trials": self.trials,
+            "max_trials": self.max_trials,
+            "folds": self.folds,
+            "max_folds": self.max_folds,
+            "seconds": round(self.elapsed, 3),
+            "max_seconds": self.max_seconds,
+            "good": self.good,
+            "target_good": self.target_good,
+        }
+
+    def print_report(self):
+        r = self.report()
+        limits = [f"{r['trials']}/{r['max_trials']} trials"]
+        limits.append(f"{r['folds']}" + (f"/{r['max_folds']}" if r['max_folds'] else "") + " folds")
+        limits.append(f"{r['seconds']:.1f}" + (f"/{r['max_seconds']}" if r['max_seconds'] else "") + " s")
+        print(f"Design budget: stopped on {r['stop_reason']} with {r['good']}/{r['target_good']} good designs; "
+              f"used " + ", ".join(limits))
+
+
+def _budgeted_results(db, constraints, rng, budget, workers, engine="inverse_fold"):
+    """
+    Run trials in waves (one trial per worker) until the budget says stop.
+    Yields (result, tries).
+    """
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        while budget.exhausted() is None:
+            n_tries = budget.next_tries()
+            wave = min(workers or 1, budget.max_trials - budget.trials)
+            if budget.max_folds is not None:
+                # split the remaining folds over the wave instead of overshooting
+                remaining = budget.max_folds - budget.folds
+                wave = max(1, min(wave, remaining))
+                n_tries = max(1, min(n_tries, remaining // wave))
+            trials = [(db, constraints, n_tries, rng.getrandbits(32), budget.deadline, engine)
+                      for _ in range(wave)]
+            results = pool.map(_design_trial, trials) if pool else map(_design_trial, trials)
+            for result, tries in results:
+                yield result, tries
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
 def generate_candidates_for_scaffold(
     scaffold_name: str,
     n_candidates: int = 5,
     rng_seed: int = 42,
+    workers: int = None,
+    budget: DesignBudget = None,
+    engine: str = "inverse_fold",
+    dedup: Deduplicator = None,
 ):
     """
     Full pipeline for one scaffold:
@@ -286,51 +767,167 @@ def generate_candidates_for_scaffold(
       - sample motif configuration
       - convert motifs -> constraints
       - run inverse folding multiple times
-    Returns a list of dicts with sequence, structure, mfe, etc.
+    Each trial gets its own seed drawn from rng_seed, so the ranked result is
+    the same whether the trials run serially or spread over `workers` processes.
+    workers: None or 1 runs serially, N > 1 uses a pool of N processes.
+    budget: optional DesignBudget. Trials then stop as soon as enough designs
+        meet its quality bar or a time/fold/trial cap is hit, and the tries
+        per trial adapt to the recent success rate; budget.report() tells
+        what was used. With a budget, results depend on the number of workers,
+        since trials run in waves of one per worker.
+    engine: "inverse_fold" restarts RNA.inverse_fold up to n_tries times per
+        trial; "local_search" refines one sequence with targeted mutations
+        (local_search_design), LOCAL_SEARCH_STEPS full folds per try.
+    dedup: optional Deduplicator, e.g. Deduplicator(max_hamming=3) to also
+        drop near-duplicates; exact (sequence, predicted_ss) repeats are
+        always dropped. Trials that hit a duplicate are replaced by new ones
+        (with a budget, they simply do not count as good designs), and
+        dedup.removed tells how many were dropped.
+    Returns a list of dicts with sequence, structure, mfe, etc., all distinct.
     """
-    rng = random.Random(rng_seed)
-    db = scaffold[scaffold_name]
+    if dedup is None:
+        dedup = Deduplicator()
+    with instrumentation.span("design", scaffold=scaffold_name):
+        candidates = _generate_candidates(scaffold_name, n_candidates, rng_seed, workers, budget, engine, dedup)
+    if dedup.removed:
+        dedup.print_report()
 
-    # 1) find hairpin loops in the scaffold
-    loops = find_hairpin_loops(db)
+    # sort by base-pair distance, then by MFE (more negative = better)
+    candidates.sort(key=lambda c: (c["bp_distance"], c["mfe"]))
 
-    # 2) sample motif configuration for this scaffold
-    motif_cfg = sample_motif_configuration(scaffold_name, loops, rng)
+    return candidates[:n_candidates]
 
-    # 3) convert motifs -> constraints + annotation
-    constraints, annotation = motifs_to_constraints(db, loops, motif_cfg, rng)
 
+def _generate_candidates(scaffold_name, n_candidates, rng_seed, workers, budget, engine, dedup):
+    if budget is None:
+        return list(iter_candidates_for_scaffold(scaffold_name, n_candidates, rng_seed, workers, engine, dedup))
+    rng = random.Random(rng_seed)
+    db, motif_cfg, constraints, annotation = _prepare_scaffold(scaffold_name, rng)
+    budget.start(n_candidates)
     candidates = []
+    for result, tries in _budgeted_results(db, constraints, rng, budget, workers, engine):
+        instrumentation.count("design_trials", engine=engine)
+        instrumentation.count("design_tries", tries, engine=engine)
+        candidate = None if result is None else _make_candidate(result, db, motif_cfg, annotation, constraints)
+        if candidate is not None and not dedup.is_new(candidate):
+            candidate = None
+        budget.record(candidate, tries)
+        if candidate is not None:
+            candidates.append(candidate)
+    budget.print_report()
+    return candidates
+
+
+def sweep_motif_configurations(
+    scaffold_name: str,
+    trials_per_config: int = 10,
+    n_candidates: int = 3,
+    rng_seed: int = 42,
+    workers: int = None,
+    engine: str = "inverse_fold",
+    n_tries: int = 5,
+    max_distance: int = 0,
+):
+    """
+    Design for every distinct motif configuration of a scaffold
+    (CompiledScaffold.configurations) instead of one random draw.
+
+    Each configuration draws two seeds from rng_seed, one for its constraint
+    fill (templates are memoized per configuration) and one for its
+    `trials_per_config` design trials, so the two random streams are
+    independent. The trials of all configurations go through one process
+    pool, so small configurations do not leave workers idle; the result is
+    the same for any number of workers.
+
+    Returns one dict per configuration, best success rate first, with
+    motifs, trials, solved (motifs intact and bp_distance <= max_distance),
+    success_rate, tries, best_mfe and the n_candidates best distinct candidates.
+    """
+    compiled = get_default_registry().get(scaffold_name)
+    rng = random.Random(rng_seed)
+    runs = []
+    trials = []
+    for config in compiled.configurations():
+        fill_seed, design_seed = rng.getrandbits(32), rng.getrandbits(32)
+        constraints, annotation = compiled.fill(config, random.Random(fill_seed))
+        runs.append({"motifs": config, "constraints": constraints, "annotation": annotation})
+        trial_rng = random.Random(design_seed)
+        trials += [(compiled.dot_bracket, constraints, n_tries, trial_rng.getrandbits(32), None, engine)
+                   for _ in range(trials_per_config)]
+
+    with instrumentation.span("sweep", scaffold=scaffold_name):
+        if workers is None or workers <= 1:
+            results = list(map(_design_trial, trials))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_design_trial, trials, chunksize=max(1, len(trials) // (workers * 4))))
+
+    report = []
+    for k, run in enumerate(runs):
+        dedup = Deduplicator()
+        candidates = []
+        solved = tries_used = 0
+        for result, tries in results[k * trials_per_config:(k + 1) * trials_per_config]:
+            instrumentation.count("design_trials", engine=engine)
+            instrumentation.count("design_tries", tries, engine=engine)
+            tries_used += tries
+            if result is None:
+                continue
+            candidate = _make_candidate(result, compiled.dot_bracket, run["motifs"], run["annotation"],
+                                        run["constraints"])
+            solved += candidate["motifs_intact"] and candidate["bp_distance"] <= max_distance
+            if dedup.is_new(candidate):
+                candidates.append(candidate)
+        candidates.sort(key=lambda c: (c["bp_distance"], c["mfe"]))
+        report.append({
+            "motifs": run["motifs"],
+            "trials": trials_per_config,
+            "solved": solved,
+            "success_rate": solved / trials_per_config if trials_per_config else 0.0,
+            "tries": tries_used,
+            "best_mfe": candidates[0]["mfe"] if candidates else None,
+            "candidates": candidates[:n_candidates],
+        })
+    report.sort(key=lambda r: (-r["success_rate"], r["best_mfe"] if r["best_mfe"] is not None else math.inf))
+    return report
 
-    # oversample a bit so we can pick the best n_candidates
-    n_trials = max(n_candidates * 3, n_candidates)
 
-    for t in range(n_trials):
-        result = inverse_fold_with_constraints(db, constraints, n_tries=5, rng=rng)
-        if result is None:
-            continue
-        seq, pred_ss, mfe, dist = result
-        candidates.append({
-            "sequence": seq,
-            "predicted_ss": pred_ss,
-            "target_ss": db,
-            "mfe": mfe,
-            "bp_distance": dist,
-            "motifs": motif_cfg,
-            "annotation": annotation,
-        })
+def describe_motifs(motifs):
+    """
+    Short label for a motif configuration, e.g. "KL(0-2,1-3) GNRA(4) UUCG(5)".
+    """
+    kissing = sorted({tuple(sorted((i, m["pair_with"]))) for i, m in motifs.items() if m["type"] == "kissing"})
+    parts = ["KL(" + ",".join(f"{a}-{b}" for a, b in kissing) + ")"] if kissing else []
+    for motif in ("GNRA", "UUCG"):
+        loops = [str(i) for i, m in sorted(motifs.items()) if m["type"] == motif]
+        if loops:
+            parts.append(f"{motif}({','.join(loops)})")
+    return " ".join(parts)
 
-    # sort by base-pair distance, then by MFE (more negative = better)
-    candidates.sort(key=lambda c: (c["bp_distance"], c["mfe"]))
 
-    return candidates[:n_candidates]
+def print_sweep_report(scaffold_name, report):
+    print(f"Motif sweep for {scaffold_name}: {len(report)} configurations")
+    print(f"{'configuration':<40}{'solved':>10}{'rate':>8}{'tries':>8}{'best MFE':>10}")
+    for r in report:
+        best = f"{r['best_mfe']:.2f}" if r["best_mfe"] is not None else "-"
+        print(f"{describe_motifs(r['motifs']):<40}{r['solved']:>5}/{r['trials']:<4}{r['success_rate']:>8.0%}"
+              f"{r['tries']:>8}{best:>10}")
 
 
 # =========================
 # 8. Save generated candidates
 # =========================
 
-def save_candidates(scaffold_name, candidates, out_dir="designed_sequences"):
+def save_candidates(scaffold_name, candidates, out_dir="designed_sequences", store=None, run=None):
+    """
+    Write one .txt file per candidate to out_dir, or, if `store` (a
+    candidate_store.CandidateStore) is given, append them to it instead:
+    motif data kept once per run, a single file for any number of designs.
+    `run` names the design run in the store; a run already stored is skipped.
+    """
+    if store is not None:
+        store.add_candidates(scaffold_name, candidates, run=run)
+        return
     os.makedirs(out_dir, exist_ok=True)
     for i, c in enumerate(candidates):
         base = f"{scaffold_name}_cand{i+1}"
@@ -342,6 +939,7 @@ def save_candidates(scaffold_name, candidates, out_dir="designed_sequences"):
             f.write(f"Predicted_SS: {c['predicted_ss']}\n")
             f.write(f"MFE: {c['mfe']}\n")
             f.write(f"BP_distance: {c['bp_distance']}\n")
+            f.write(f"Motifs_intact: {c['motifs_intact']}\n")
 
 
 # =========================
@@ -356,35 +954,66 @@ def write_rnacomposer_input(sequence, dot_bracket):
 # 10. 
 # =========================
 
-def create_pdb_from_RNAComposer(rc_input, counter):
-    driver = webdriver.Chrome()
-    driver.get("https://rnacomposer.cs.put.poznan.pl")
-    wait = WebDriverWait(driver, 10)
-
-    # Finding the textbox
-    textarea = wait.until(
-        EC.presence_of_element_located(
-            (By.XPATH, "//textarea[@id='sequence' or @id='input']")
-        )
-    )
-    # Injection
-    sequence_and_structure = rc_input
-    textarea.clear()
-    textarea.send_keys(sequence_and_structure)
-
-    # Finding compose button
-    compose_btn = driver.find_element(By.XPATH, "//input[@value='Compose']")
-    compose_btn.click()
-
-    # Waiting for the new page to load
-    time.sleep(35)
-
-    pdb_link = wait.until(
-        EC.presence_of_element_located((By.XPATH, "//a[contains(@href, 'Predict.pdb')]"))
-    )
-    pdb_url = pdb_link.get_attribute("href")
-    r = requests.get(pdb_url, allow_redirects=True)
-    os.makedirs("pdb_files", exist_ok=True)
+def create_pdb_from_RNAComposer(rc_input, counter, timeout=600, cache=None):
+    # A model already built for this exact input is reused without opening a browser
+    if cache is None:
+        cache = get_default_cache()
     new_file = os.path.join("pdb_files", f'new_RNA_{counter}.pdb')
-    open(new_file, 'wb').write(r.content)
-    driver.quit()
\ No newline at end of file
+    if cache and cache.get(rc_input, new_file) is not None:
+        print(f"Model cache hit for {new_file}")
+        return new_file
+
+    # the browser stack is only needed here, so it is not loaded with the module
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # a browser session from the shared pool, reset and handed back afterwards
+    with webdriver_pool.get_default_pool().session() as driver:
+        with instrumentation.span("selenium.page_load", candidate=counter):
+            driver.get(rnacomposer.RNACOMPOSER_URL)
+            wait = WebDriverWait(driver, 10)
+
+            # Finding the textbox
+            textarea = wait.until(
+                EC.presence_of_element_located(
+                    (By.XPATH, "//textarea[@id='sequence' or @id='input']")
+                )
+            )
+        # Injection
+        sequence_and_structure = rc_input
+        textarea.clear()
+        textarea.send_keys(sequence_and_structure)
+
+        # Finding compose button
+        compose_btn = driver.find_element(By.XPATH, "//input[@value='Compose']")
+        compose_btn.click()
+
+        # Polling for the result link instead of sleeping a fixed time
+        with instrumentation.span("rnacomposer.wait", candidate=counter):
+            pdb_link = WebDriverWait(driver, timeout, poll_frequency=2).until(
+                EC.presence_of_element_located((By.XPATH, "//a[contains(@href, 'Predict.pdb')]"))
+            )
+        pdb_url = pdb_link.get_attribute("href")
+        with instrumentation.span("pdb_download", candidate=counter):
+            rnacomposer.download_pdb(rnacomposer.get_session(), pdb_url, new_file)
+    if cache:
+        cache.put(rc_input, new_file)
+    return new_file
+
+
+def create_pdbs_from_RNAComposer(inputs, max_in_flight=4, out_dir="pdb_files",
+                                 base_url=rnacomposer.RNACOMPOSER_URL, timeout=600, cache=None):
+    """
+    Model many designs concurrently without a browser.
+    inputs: iterable of (sequence, dot_bracket)
+    cache: ModelCache to consult first (default: ./model_cache, False disables it)
+    Yields (counter, pdb_path) in completion order; counters start at 1 in
+    input order, so files are named like create_pdb_from_RNAComposer's.
+    pdb_path is None for a job that failed.
+    """
+    if cache is None:
+        cache = get_default_cache()
+    rc_inputs = (write_rnacomposer_input(seq, ss) for seq, ss in inputs)
+    yield from rnacomposer.compose_pdbs(rc_inputs, out_dir=out_dir, max_in_flight=max_in_flight,
+                                        base_url=base_url, timeout=timeout, cache=cache or None)
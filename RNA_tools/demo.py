@@ -2,41 +2,86 @@
 # Demo
 # =========================
 
+import easygui as eg
 import create_rna_data as cr
 import rna_visualizer as rv
 import process_rna_data as prd
+import os
+import pipeline
+import rnacomposer
+import instrumentation
+import modeling_backends
+import webdriver_pool
 
-if __name__ == "__main__":
-    scaffold_name = cr.eg.choicebox("Pick one of the sccafolds", "Scaffold", cr.scaffold.keys())
-    cands = cr.generate_candidates_for_scaffold(scaffold_name, n_candidates=cr.eg.integerbox("Number of candidates"))
+def run_phased(scaffold_name, n_candidates, base_url=rnacomposer.RNACOMPOSER_URL, cache=None, ensemble_filter=None,
+               backend=None):
+    """
+    Design everything, then model everything, then analyse everything.
+    Models go through the durable job queue (modeling_backends), so a
+    failed or timed-out job is retried instead of ending the run, and
+    models finished by an earlier run are not redone.
+    base_url / cache: RNAComposer address and model cache (None = default
+    cache, False = none) for the default RNAComposerBackend.
+    ensemble_filter: optional ensemble_filter.EnsembleFilter; only the
+    designs it keeps are modeled.
+    backend: modeling_backends.Backend to use instead, e.g. FakeBackend().
+    Returns the most stable analysis record.
+    """
+    with instrumentation.span("demo.design"):
+        cands = cr.generate_candidates_for_scaffold(scaffold_name, n_candidates=n_candidates)
 
     cr.save_candidates(scaffold_name, cands)
+    if ensemble_filter is not None:
+        with instrumentation.span("demo.prefilter"):
+            cands = ensemble_filter.apply(cands)
+        ensemble_filter.print_report()
 
-    # Designing
-    count = 0
-    for candidate in cands:
-        count += 1
-        seq = candidate["sequence"]
-        ss = candidate["predicted_ss"]  # or best["target_ss"]
-        # 1) Write inputs for RNAComposer
-        rna_composer_input = cr.write_rnacomposer_input(seq, ss)
-        # 2) Creates the .pdb file
-        cr.create_pdb_from_RNAComposer(rna_composer_input, count)
+    # Designing: submit all candidates to RNAComposer, a few jobs at a time
+    inputs = [cr.write_rnacomposer_input(candidate["sequence"], candidate["predicted_ss"])  # or candidate["target_ss"]
+              for candidate in cands]
+    if backend is None:
+        if cache is None:
+            cache = cr.get_default_cache()
+        backend = modeling_backends.RNAComposerBackend(base_url, cache=cache or None, max_concurrency=4)
+    pdb_paths = []
+    with instrumentation.span("demo.model"):
+        for counter, pdb_path in modeling_backends.model_pdbs(inputs, backend):
+            if pdb_path is not None:
+                pdb_paths.append(pdb_path)
+                print(f"Model {counter} saved to {pdb_path} ({len(pdb_paths)}/{len(inputs)})")
+    # the model cache actually consulted, if any (other backends have none)
+    used_cache = getattr(backend, "cache", None)
+    if used_cache:
+        used_cache.report()
     
     # Checking RNA stability
-    prd.os.makedirs("MFE_test", exist_ok=True)
-    prd.os.path.join("MFE_test", f'output{count}')
-    dict_MFE = {}
-    for file in rv.os.listdir("pdb_files"):
-        prd.process_structure_file(f"pdb_files/{file}", f"MFE_test/output_{rv.os.path.basename(file)}")
-        dict_MFE[file] = 0
-    with open("analysis/energy.txt") as f:
-        lines = f.read().splitlines()
-    prd.os.remove("analysis/energy.txt")
-    for i, key in enumerate(dict_MFE):
-        dict_MFE[key] = float(lines[i])
-    dict_MFE_sorted = dict(sorted(dict_MFE.items(), key=lambda item: item[1]))
-    top1 = list(dict_MFE_sorted.keys())[0]
+    with instrumentation.span("demo.analysis"):
+        records = prd.analyze_structure_files(pdb_paths, "MFE_test", workers=prd.os.cpu_count())
+    top1 = prd.most_stable(records)
+    return top1
+
+if __name__ == "__main__":
+    metrics_dir = os.environ.get(instrumentation.METRICS_ENV)
+    if metrics_dir:
+        instrumentation.enable()
+
+    scaffold_name = eg.choicebox("Pick one of the sccafolds", "Scaffold", cr.get_default_registry().names())
+    n_candidates = eg.integerbox("Number of candidates")
+    mode = eg.buttonbox("How should the candidates be processed?", "Run mode", ["Pipelined", "Phased"])
+
+    if mode == "Pipelined":
+        # Design, 3D modeling and analysis overlap, connected by bounded queues
+        cache = cr.get_default_cache()
+        top1 = pipeline.run_pipeline(scaffold_name, n_candidates, analysis_workers=prd.os.cpu_count(),
+                                     cache=cache)["best"]
+        cache.report()
+    else:
+        top1 = run_phased(scaffold_name, n_candidates)
+    print(f"Most stable design: {top1['file']} chain {top1['chain']} (MFE: {top1['mfe']:.2f})")
 
     # Displaying RNA structure in an interactive window
-    rv.represent(f"pdb_files/{top1}")
\ No newline at end of file
+    rv.represent(top1["file"], pool=webdriver_pool.DriverPool(size=1, headless=False))
+
+    if metrics_dir:
+        json_path, prom_path = instrumentation.write_reports(metrics_dir)
+        print(f"Run metrics written to {json_path} and {prom_path}")
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Ensemble-based pre-filter between design and 3D modeling.
+
+Designs are ranked by bp_distance and MFE, which says nothing about how
+well the target structure dominates the Boltzmann ensemble. A partition
+function per candidate costs milliseconds; an RNAComposer model costs at
+least half a minute. EnsembleFilter scores every candidate on
+
+  - target_probability: Boltzmann probability of the target structure
+  - ensemble_defect:    normalized ensemble defect of the target structure
+                        (0 = every nucleotide in its target state)
+
+and forwards only the top-K by ensemble defect and/or those that pass the
+thresholds. The report tells how many models, and how much modeling time,
+were skipped.
+
+    ef = EnsembleFilter(top_k=5, max_defect=0.2, workers=4)
+    kept = ef.apply(candidates)
+    ef.print_report()
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import fold_service
+import instrumentation
+
+# Rough seconds one RNAComposer model takes, used to estimate the time saved
+MODEL_SECONDS = 35.0
+
+def ensemble_metrics(sequence, target_ss, mfe=None):
+    """
+    Partition-function metrics of `target_ss` for `sequence`.
+
+    Args:
+        sequence (str): RNA sequence
+        target_ss (str): dot-bracket target structure
+        mfe (float): MFE of the sequence if already known, used to rescale
+            the Boltzmann factors (folded here otherwise)
+    Returns a dict with target_probability, ensemble_defect and
+    ensemble_energy (kcal/mol).
+    """
+    fc = fold_service.get_fold_service().fold_compound(sequence.upper())
+    if mfe is None:
+        _, mfe = fc.mfe()
+    # keeps the partition function in range for long sequences
+    fc.exp_params_rescale(mfe)
+    _, ensemble_energy = fc.pf()
+    return {
+        "target_probability": fc.pr_structure(target_ss),
+        "ensemble_defect": fc.ensemble_defect(target_ss),
+        "ensemble_energy": ensemble_energy,
+    }
+
+def _metrics_job(args):
+    # top-level so it can be pickled for ProcessPoolExecutor
+    return ensemble_metrics(*args)
+
+def _timed_metrics_job(args):
+    t0 = time.perf_counter()
+    return ensemble_metrics(*args), time.perf_counter() - t0
+
+
+class EnsembleFilter:
+    """
+    Scores candidates on their ensemble and keeps the promising ones.
+
+    Args:
+        top_k (int): forward at most this many candidates, lowest ensemble
+            defect first (ties broken by higher target probability)
+        min_probability (float): drop candidates whose target structure has
+            a lower Boltzmann probability
+        max_defect (float): drop candidates with a higher ensemble defect
+        workers (int): None or 1 scores serially, N > 1 uses a pool of N processes
+        model_seconds (float): modeling time per candidate, for the report
+
+    With no limits set, every candidate is scored and forwarded.
+    """
+
+    def __init__(self, top_k=None, min_probability=None, max_defect=None, workers=None,
+                 model_seconds=MODEL_SECONDS):
+        self.top_k = top_k
+        self.min_probability = min_probability
+        self.max_defect = max_defect
+        self.workers = workers
+        self.model_seconds = model_seconds
+
+        self.scored = 0
+        self.considered = 0
+        self.forwarded = 0
+        self.seconds = 0.0
+
+    def score(self, candidates):
+        """
+        Add target_probability, ensemble_defect and ensemble_energy to every
+        candidate that does not have them yet. Returns the candidates.
+        """
+        todo = [c for c in candidates if "ensemble_defect" not in c]
+        if not todo:
+            return candidates
+        t0 = time.perf_counter()
+        with instrumentation.span("ensemble_filter.score"):
+            jobs = [(c["sequence"], c["target_ss"], c.get("mfe")) for c in todo]
+            if self.workers and self.workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    metrics = list(pool.map(_metrics_job, jobs, chunksize=max(1, len(jobs) // (4 * self.workers))))
+            else:
+                metrics = [_metrics_job(job) for job in jobs]
+        for candidate, m in zip(todo, metrics):
+            candidate.update(m)
+        self.scored += len(todo)
+        self.seconds += time.perf_counter() - t0
+        return candidates
+
+    def stream(self, candidates, mp_context=None):
+        """
+        Score candidates while they are still being produced and yield each
+        one once scored, in completion order. With workers > 1 the scoring
+        runs on a pool of that many processes, at most 2 * workers
+        candidates ahead, so the producer (e.g. a design loop) is not held
+        up by it; otherwise each candidate is scored in turn. Closing the
+        generator cancels the scoring not started yet.
+        """
+        if not self.workers or self.workers <= 1:
+            for candidate in candidates:
+                yield self.score([candidate])[0]
+            return
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context)
+        pending = {}
+        try:
+            for candidate in candidates:
+                if "ensemble_defect" in candidate:
+                    yield candidate
+                    continue
+                job = (candidate["sequence"], candidate["target_ss"], candidate.get("mfe"))
+                pending[pool.submit(_timed_metrics_job, job)] = candidate
+                if len(pending) >= 2 * self.workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                else:
+                    done = [future for future in pending if future.done()]
+                for future in done:
+                    yield self._scored(pending.pop(future), *future.result())
+            for future in as_completed(list(pending)):
+                yield self._scored(pending.pop(future), *future.result())
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _scored(self, candidate, metrics, seconds):
+        candidate.update(metrics)
+        self.scored += 1
+        self.seconds += seconds
+        instrumentation.observe("ensemble_filter.score", seconds)
+        return candidate
+
+    def passes(self, candidate):
+        """
+        Whether a scored candidate meets the thresholds (top_k is not applied here).
+        """
+        if self.min_probability is not None and candidate["target_probability"] < self.min_probability:
+            return False
+        return self.max_defect is None or candidate["ensemble_defect"] <= self.max_defect
+
+    def apply(self, candidates):
+        """
+        Score `candidates` and return the ones to model, best ensemble first.
+        """
+        self.score(candidates)
+        kept = [c for c in candidates if self.passes(c)]
+        kept.sort(key=lambda c: (c["ensemble_defect"], -c["target_probability"]))
+        if self.top_k is not None:
+            kept = kept[:self.top_k]
+        self.record(len(kept), len(candidates))
+        return kept
+
+    def record(self, forwarded, considered):
+        """
+        Count `forwarded` of `considered` candidates as sent on to modeling
+        (apply() does this itself).
+        """
+        self.considered += considered
+        self.forwarded += forwarded
+        instrumentation.count("prefilter_forwarded", forwarded)
+        instrumentation.count("prefilter_skipped", considered - forwarded)
+
+    @property
+    def skipped(self):
+        return self.considered - self.forwarded
+
+    def report(self):
+        saved = self.skipped * self.model_seconds
+        return {
+            "scored": self.scored,
+            "considered": self.considered,
+            "forwarded": self.forwarded,
+            "skipped": self.skipped,
+            "scoring_seconds": round(self.seconds, 3),
+            "modeling_seconds_saved": round(saved, 1),
+        }
+
+    def print_report(self):
+        r = self.report()
+        print(f"Ensemble filter: scored {r['scored']} candidates in {r['scoring_seconds']:.2f} s, "
+              f"forwarded {r['forwarded']}/{r['considered']}, skipped {r['skipped']} models "
+              f"(~{r['modeling_seconds_saved']:.0f} s of modeling saved)")
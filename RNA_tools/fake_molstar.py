@@ -0,0 +1,73 @@
+"""
+Offline stand-in for the Selenium driver used by rna_visualizer.represent().
+
+Accepts the same calls (get, find_element, click, send_keys, quit, plus the
+execute_script / delete_all_cookies used by webdriver_pool) against the
+Mol*Star viewer page and records the uploaded files instead of opening a
+browser:
+
+    driver = represent("pdb_files/new_RNA_1.pdb", driver=FakeMolstarDriver())
+    driver.uploads  # [(path, size in bytes)]
+
+DriverPool(factory=FakeMolstarDriver) gives an offline pool; crash() makes
+a driver fail like a dead browser.
+"""
+import time
+
+class _FakeElement:
+    def __init__(self, driver, selector):
+        self.driver = driver
+        self.selector = selector
+
+    def click(self):
+        self.driver.clicks.append(self.selector)
+        time.sleep(self.driver.delay)
+
+    def send_keys(self, value):
+        # the viewer reads every file on upload; several paths come newline-separated
+        for path in value.split("\n"):
+            with open(path, "rb") as f:
+                size = len(f.read())
+            self.driver.uploads.append((path, size))
+
+class FakeMolstarDriver:
+    """
+    Records what represent() does. `delay` seconds are spent per page load
+    and per click to stand in for the browser's latency.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.url = None
+        self.clicks = []
+        self.uploads = []
+        self.closed = False
+        self.crashed = False
+
+    def _check(self):
+        if self.crashed or self.closed:
+            raise RuntimeError("browser session is gone")
+
+    def get(self, url):
+        self._check()
+        self.url = url
+        time.sleep(self.delay)
+
+    def find_element(self, by, selector):
+        self._check()
+        if self.url is None:
+            raise RuntimeError("find_element() before get()")
+        return _FakeElement(self, selector)
+
+    def execute_script(self, script):
+        self._check()
+        return 1 if script.strip() == "return 1" else None
+
+    def delete_all_cookies(self):
+        self._check()
+
+    def crash(self):
+        self.crashed = True
+
+    def quit(self):
+        self.closed = True
@@ -0,0 +1,156 @@
+"""
+Local stand-in for the RNAComposer web server.
+
+Serves the same compose form / job page / Predict.pdb link flow as the real
+site so that rnacomposer.compose_pdbs() can be exercised offline:
+
+    with FakeRNAComposer(delay=2.0) as server:
+        for index, path in compose_pdbs(inputs, base_url=server.url):
+            ...
+
+or from the command line:
+
+    python fake_rnacomposer.py --port 8765 --delay 5
+"""
+import math
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+FORM_PAGE = """<html><body>
+<form id="composer" action="/compose" method="post">
+<input type="hidden" name="javax.faces.ViewState" value="fake-view-state"/>
+<textarea id="input" name="input"></textarea>
+<input type="submit" name="send" value="Compose"/>
+</form>
+</body></html>"""
+
+def fake_pdb(sequence):
+    """
+    Build a minimal PDB model for `sequence`: one P atom per nucleotide on a helix.
+    """
+    lines = []
+    for i, base in enumerate(sequence, start=1):
+        angle = i * 2 * math.pi / 11
+        x, y, z = 9.0 * math.cos(angle), 9.0 * math.sin(angle), 2.8 * i
+        lines.append(
+            f"ATOM  {i:5d}  P   {base:>3s} A{i:4d}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00           P"
+        )
+    lines.append("TER   ")
+    lines.append("END   ")
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html", headers=None):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.strip("/").split("/")
+        if self.path in ("/", ""):
+            self._send(200, FORM_PAGE)
+        elif len(parts) == 2 and parts[0] == "task" and parts[1] in server.jobs:
+            job = server.jobs[parts[1]]
+            if time.monotonic() - job["submitted"] < server.delay:
+                self._send(200, "<html><body>Processing...</body></html>")
+            else:
+                link = f'<a href="/files/{parts[1]}/Predict.pdb">Predict.pdb</a>'
+                self._send(200, f"<html><body>{link}</body></html>")
+        elif len(parts) == 3 and parts[0] == "files" and parts[1] in server.jobs:
+            job = server.jobs[parts[1]]
+            server.downloads += 1
+            self._send(200, fake_pdb(job["sequence"]), "chemical/x-pdb")
+        else:
+            self._send(404, "Not found")
+
+    def do_POST(self):
+        server = self.server
+        if self.path != "/compose":
+            self._send(404, "Not found")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        lines = form.get("input", [""])[0].strip().splitlines()
+        if len(lines) < 3 or form.get("javax.faces.ViewState") is None:
+            self._send(400, "Bad request")
+            return
+        job_id = uuid.uuid4().hex
+        with server.lock:
+            server.jobs[job_id] = {"sequence": lines[1].strip(), "submitted": time.monotonic()}
+            server.submissions += 1
+        self._send(303, "", headers={"Location": f"/task/{job_id}"})
+
+class FakeRNAComposer:
+    """
+    Threaded HTTP server imitating RNAComposer on localhost.
+
+    Args:
+        delay (float): seconds a job stays "Processing..." before its link appears
+        port (int): port to bind, 0 picks a free one
+    """
+
+    def __init__(self, delay=1.0, port=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+        self.httpd.jobs = {}
+        self.httpd.lock = threading.Lock()
+        self.httpd.submissions = 0
+        self.httpd.downloads = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def submissions(self):
+        return self.httpd.submissions
+
+    @property
+    def downloads(self):
+        return self.httpd.downloads
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local RNAComposer stand-in.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = FakeRNAComposer(delay=args.delay, port=args.port)
+    print(f"Fake RNAComposer listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
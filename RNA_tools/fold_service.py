@@ -0,0 +1,471 @@
+import bisect
+import os
+import sqlite3
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import RNA
+import instrumentation
+
+# Model details that change the folding result, and so belong in the cache key
+MODEL_PARAMS = ("temperature", "dangles", "noLP", "noGU", "noGUclosure", "max_bp_span")
+
+# Set this to a file path to share a persistent fold store between runs and worker processes
+STORE_ENV = "RNA_TOOLS_FOLD_STORE"
+
+class FoldService:
+    """
+    Memoized MFE folding shared by the design and analysis code.
+
+    Results are kept in an in-memory LRU and, if `store_path` is given, in a
+    SQLite store keyed by (model parameters, sequence) that survives between
+    runs. Folding goes through ViennaRNA fold compounds built from one shared
+    model-details object; recently used compounds are kept so later work on
+    the same sequence (energy evaluation, partition function) reuses them.
+
+    Args:
+        maxsize (int): number of folds kept in memory
+        store_path (str): optional SQLite file for persistent results
+        compounds (int): number of fold compounds kept alive
+        **model_params: ViennaRNA model details, e.g. temperature=25.0
+    """
+
+    def __init__(self, maxsize=100000, store_path=None, compounds=32, **model_params):
+        self.md = RNA.md()
+        for name, value in model_params.items():
+            setattr(self.md, name, value)
+        self.params_key = ";".join(f"{name}={getattr(self.md, name)}" for name in MODEL_PARAMS)
+
+        self.maxsize = maxsize
+        self.max_compounds = compounds
+        self._folds = OrderedDict()
+        self._compounds = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+        self.store_path = store_path
+        self._db = None
+        self._db_pid = None
+        self._inherited = []
+        self._store()
+
+    def _store(self):
+        """
+        The SQLite store connection of this process, or None without a store.
+        A SQLite connection must not be used across fork(), so a forked
+        worker opens its own; the parent's is kept (unused, not closed) so
+        closing it cannot disturb the parent.
+        """
+        if not self.store_path:
+            return None
+        if self._db_pid != os.getpid():
+            if self._db is not None:
+                self._inherited.append(self._db)
+            self._db = sqlite3.connect(self.store_path, check_same_thread=False, timeout=30)
+            self._db_pid = os.getpid()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS folds ("
+                " params TEXT, sequence TEXT, structure TEXT, mfe REAL,"
+                " PRIMARY KEY (params, sequence))"
+            )
+            self._db.commit()
+        return self._db
+
+    def model(self, **overrides):
+        """
+        A copy of this service's model details with some values replaced, e.g. model(max_bp_span=300).
+        """
+        md = RNA.md()
+        for name in MODEL_PARAMS:
+            setattr(md, name, getattr(self.md, name))
+        for name, value in overrides.items():
+            setattr(md, name, value)
+        return md
+
+    def fold_compound(self, sequence, options=None):
+        """
+        Return a (cached) fold compound for `sequence` built with this service's model details.
+        """
+        if options is not None:
+            return RNA.fold_compound(sequence, self.md, options)
+        with self._lock:
+            fc = self._compounds.get(sequence)
+            if fc is not None:
+                self._compounds.move_to_end(sequence)
+                return fc
+        fc = RNA.fold_compound(sequence, self.md)
+        with self._lock:
+            self._compounds[sequence] = fc
+            while len(self._compounds) > self.max_compounds:
+                self._compounds.popitem(last=False)
+        return fc
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._folds[key] = result
+            while len(self._folds) > self.maxsize:
+                self._folds.popitem(last=False)
+
+    def fold(self, sequence, max_bp_span=None, window=None):
+        """
+        Same result as RNA.fold(sequence): (structure, mfe).
+
+        With max_bp_span, no base pair spans more than that many nucleotides.
+        With window, the sequence is folded locally instead (see fold_local).
+        Each variant is cached separately.
+        """
+        sequence = sequence.upper()
+        if max_bp_span is None and window is None:
+            key, params = sequence, self.params_key
+        else:
+            key = (max_bp_span, window, sequence)
+            replaced = {"max_bp_span": max_bp_span or -1}
+            params = ";".join(f"{name}={replaced.get(name, getattr(self.md, name))}" for name in MODEL_PARAMS)
+            if window is not None:
+                params += f";window={window}"
+
+        with self._lock:
+            result = self._folds.get(key)
+            if result is not None:
+                self._folds.move_to_end(key)
+                self.memory_hits += 1
+        if result is not None:
+            instrumentation.count("fold_calls", source="memory")
+            return result
+
+        db = self._store()
+        if db is not None:
+            with self._lock:
+                row = db.execute(
+                    "SELECT structure, mfe FROM folds WHERE params = ? AND sequence = ?",
+                    (params, sequence),
+                ).fetchone()
+            if row is not None:
+                result = (row[0], row[1])
+                self._remember(key, result)
+                with self._lock:
+                    self.store_hits += 1
+                instrumentation.count("fold_calls", source="store")
+                return result
+
+        instrumentation.count("fold_calls", source="computed")
+        with instrumentation.span("fold"):
+            if window is not None:
+                structure, mfe = self.fold_local(sequence, window, max_bp_span)
+            elif max_bp_span is not None:
+                structure, mfe = RNA.fold_compound(sequence, self.model(max_bp_span=max_bp_span)).mfe()
+            else:
+                structure, mfe = self.fold_compound(sequence).mfe()
+        result = (structure, mfe)
+        self._remember(key, result)
+        with self._lock:
+            self.misses += 1
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO folds VALUES (?, ?, ?, ?)",
+                    (params, sequence, structure, mfe),
+                )
+                db.commit()
+        return result
+
+    def fold_local(self, sequence, window, max_bp_span=None):
+        """
+        Windowed folding (as RNALfold): every locally stable structure with
+        pairs inside `window` nucleotides (and at most max_bp_span apart, by
+        default the window). The set of non-overlapping local structures with
+        the lowest total energy forms the structure of the whole sequence;
+        the returned MFE is that structure's energy under the full model.
+        Memory grows with the window, not with the length of the sequence.
+        """
+        md = self.model(window_size=window, max_bp_span=max_bp_span or window)
+        fc = RNA.fold_compound(sequence, md, RNA.OPTION_MFE | RNA.OPTION_WINDOW)
+        hits = []
+
+        def hit(start, end, structure, energy, data):
+            if structure:
+                hits.append((start, start + len(structure) - 1, structure, energy))
+
+        fc.mfe_window_cb(hit, None)
+        structure = combine_local_structures(len(sequence), hits)
+        mfe = RNA.fold_compound(sequence, self.md, RNA.OPTION_EVAL_ONLY).eval_structure(structure)
+        return structure, mfe
+
+    def stats(self):
+        lookups = self.memory_hits + self.store_hits + self.misses
+        hits = self.memory_hits + self.store_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"Fold cache: {s['lookups']} lookups, {s['memory_hits']} memory hits, "
+              f"{s['store_hits']} store hits, {s['misses']} folds ({s['hit_rate']:.0%} hit rate)")
+
+    def close(self):
+        # only the connection opened by this process is closed
+        if self._db is not None and self._db_pid == os.getpid():
+            self._db.close()
+        self._db = None
+        self.store_path = None
+
+# =========================
+# Shared default service
+# =========================
+
+_default_service = None
+
+def get_fold_service():
+    """
+    Return the process-wide FoldService (created on first use, with a
+    persistent store if the RNA_TOOLS_FOLD_STORE environment variable is set).
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = FoldService(store_path=os.environ.get(STORE_ENV))
+    else:
+        # in a forked worker, open this process's own store connection
+        _default_service._store()
+    return _default_service
+
+def configure(**kwargs):
+    """
+    Replace the process-wide FoldService, e.g. configure(store_path="folds.sqlite", temperature=25.0).
+    """
+    global _default_service
+    if _default_service is not None:
+        _default_service.close()
+    if kwargs.get("store_path"):
+        # let worker processes started later open the same store
+        os.environ[STORE_ENV] = kwargs["store_path"]
+    _default_service = FoldService(**kwargs)
+    return _default_service
+
+def fold(sequence):
+    """
+    Memoized drop-in for RNA.fold.
+    """
+    return get_fold_service().fold(sequence)
+
+@lru_cache(maxsize=100000)
+def bp_distance(structure1, structure2):
+    """
+    Memoized drop-in for RNA.bp_distance.
+    """
+    return RNA.bp_distance(structure1, structure2)
+
+# =========================
+# Long-sequence folding
+# =========================
+
+# Analysis fold modes, most to least expensive
+FOLD_MODES = ("global", "span", "local")
+
+# Predicted cost of one fold of n nt per mode: seconds = k * n ** exponent,
+# measured with bench_fold_modes.py (max_bp_span=300, window=200). Global
+# folding grew as n^2.3 from 300 to 4000 nt rather than the textbook n^3.
+# The global and span modes fill n^2 matrices, the local mode only a window.
+COST_MODEL = {
+    "global": (1.6e-7, 2.3),
+    "span": (3.6e-8, 2.3),
+    "local": (6.0e-4, 1.0),
+}
+BYTES_PER_CELL = 6
+
+# Folds shorter than this are mostly overhead and do not recalibrate COST_MODEL
+CALIBRATION_LENGTH = 500
+
+class FoldPolicy:
+    """
+    Chooses how analysis folds each chain, by length:
+
+      global  full MFE fold, as RNA.fold
+      span    global fold in which no pair spans more than max_bp_span nt
+      local   windowed folding (RNALfold) with all pairs inside `window` nt
+
+    By default every chain is folded globally, as before the policy
+    existed. The other modes are opt-in: with max_bp_span set, chains longer
+    than span_length (or than max_bp_span itself) use the span mode; with
+    local_length set, chains longer than that are folded locally. If a
+    budget is set and the predicted time or memory of the mode is over it,
+    the next cheaper mode is used instead.
+    ViennaRNA cannot be interrupted mid-fold, so the budget is checked
+    against COST_MODEL, rescaled by the longest fold timed so far in each
+    mode.
+
+    Worker processes fold with a copy of the policy, frozen as it was when
+    the jobs were sent: their timings do not recalibrate the parent's
+    cost model. Their mode counts come back with the records (fold_mode,
+    fold_fallback) and are added to the parent's policy with merge().
+
+    Args:
+        max_bp_span (int): largest pair span in the span mode (None disables it)
+        span_length (int): chains longer than this are folded with max_bp_span (None: longer than max_bp_span)
+        window (int): window of the local mode
+        local_length (int): chains longer than this are folded locally (None: only as a fallback)
+        time_budget (float): predicted seconds allowed per chain (None: no limit)
+        memory_budget (float): predicted MB allowed per chain (None: no limit)
+    """
+
+    def __init__(self, max_bp_span=None, span_length=None, window=200, local_length=None, time_budget=None,
+                 memory_budget=None):
+        self.max_bp_span = max_bp_span
+        self.span_length = span_length
+        self.window = window
+        self.local_length = local_length
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.cost = dict(COST_MODEL)
+        self._calibrated = {}
+
+        self.used = {mode: 0 for mode in FOLD_MODES}
+        self.fallbacks = 0
+
+    def label(self, mode):
+        """
+        Mode with its parameter, as recorded in results: "global", "span:300" or "local:200".
+        """
+        if mode == "span":
+            return f"span:{self.max_bp_span}"
+        if mode == "local":
+            return f"local:{self.window}"
+        return mode
+
+    def estimate(self, mode, length):
+        """
+        Predicted (seconds, MB) of folding `length` nt in `mode`.
+        """
+        k, exponent = self.cost[mode]
+        cells = length * self.window if mode == "local" else length * length
+        return k * length ** exponent, cells * BYTES_PER_CELL / 1e6
+
+    def within_budget(self, mode, length):
+        seconds, mb = self.estimate(mode, length)
+        return ((self.time_budget is None or seconds <= self.time_budget)
+                and (self.memory_budget is None or mb <= self.memory_budget))
+
+    def choose(self, length):
+        """
+        (mode, fell_back) for a chain of `length` nt.
+        """
+        if self.local_length is not None and length > self.local_length:
+            mode = "local"
+        elif self.max_bp_span is not None and length > (self.span_length or self.max_bp_span):
+            mode = "span"
+        else:
+            mode = "global"
+        fell_back = False
+        while mode != "local" and not self.within_budget(mode, length):
+            mode = "local" if mode == "span" or self.max_bp_span is None else "span"
+            fell_back = True
+        return mode, fell_back
+
+    def calibrate(self, mode, length, seconds):
+        # the longest fold seen so far best predicts the long ones to come
+        if length < CALIBRATION_LENGTH or length <= self._calibrated.get(mode, 0):
+            return
+        self._calibrated[mode] = length
+        exponent = self.cost[mode][1]
+        self.cost[mode] = (seconds / length ** exponent, exponent)
+
+    def fold(self, sequence, service=None):
+        """
+        Fold one chain. Returns (structure, mfe, mode label, fell_back),
+        fell_back being True if the chain was over budget for its mode.
+        """
+        service = service or get_fold_service()
+        mode, fell_back = self.choose(len(sequence))
+        self.used[mode] += 1
+        self.fallbacks += fell_back
+        instrumentation.count("analysis_folds", mode=mode)
+        if fell_back:
+            instrumentation.count("fold_fallbacks")
+
+        misses = service.misses
+        t0 = time.perf_counter()
+        if mode == "local":
+            structure, mfe = service.fold(sequence, window=self.window)
+        elif mode == "span":
+            structure, mfe = service.fold(sequence, max_bp_span=self.max_bp_span)
+        else:
+            structure, mfe = service.fold(sequence)
+        if service.misses > misses:
+            self.calibrate(mode, len(sequence), time.perf_counter() - t0)
+        return structure, mfe, self.label(mode), fell_back
+
+    def merge(self, records):
+        """
+        Count the folds of analysis records made by worker processes.
+        """
+        modes = {self.label(mode): mode for mode in FOLD_MODES}
+        for record in records:
+            if record.get("fold_mode") in modes:
+                self.used[modes[record["fold_mode"]]] += 1
+                self.fallbacks += bool(record.get("fold_fallback"))
+
+    def report(self):
+        return {"used": {self.label(mode): n for mode, n in self.used.items()}, "fallbacks": self.fallbacks}
+
+    def print_report(self):
+        used = ", ".join(f"{n} {label}" for label, n in self.report()["used"].items() if n)
+        print(f"Fold modes: {used or 'no folds'}; {self.fallbacks} chains over budget used a cheaper mode")
+
+def combine_local_structures(length, hits):
+    """
+    Dot-bracket of length `length` from local structures (start, end,
+    structure, energy) with 1-based inclusive positions: the non-overlapping
+    subset with the lowest total energy (weighted interval scheduling).
+    """
+    hits = sorted(hits, key=lambda h: h[1])
+    ends = [h[1] for h in hits]
+    best = [0.0] * (len(hits) + 1)
+    take = [False] * (len(hits) + 1)
+    for k, (start, end, structure, energy) in enumerate(hits, start=1):
+        before = bisect.bisect_left(ends, start, 0, k - 1)
+        take[k] = best[before] + energy < best[k - 1]
+        best[k] = best[before] + energy if take[k] else best[k - 1]
+    chars = ["."] * length
+    k = len(hits)
+    while k > 0:
+        if take[k]:
+            start, end, structure, energy = hits[k - 1]
+            chars[start - 1:end] = structure
+            k = bisect.bisect_left(ends, start, 0, k - 1)
+        else:
+            k -= 1
+    return "".join(chars)
+
+_default_policy = None
+
+def get_fold_policy():
+    """
+    Return the process-wide FoldPolicy used by the analysis code (default settings).
+    """
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = FoldPolicy()
+    return _default_policy
+
+def configure_policy(**kwargs):
+    """
+    Replace the process-wide FoldPolicy, e.g. configure_policy(max_bp_span=150, time_budget=10).
+    """
+    global _default_policy
+    _default_policy = FoldPolicy(**kwargs)
+    return _default_policy
+
+def fold_chain(sequence, policy=None):
+    """
+    Fold a chain for analysis under `policy` (default: get_fold_policy()).
+    Returns (structure, mfe, mode label, fell_back).
+    """
+    return (policy or get_fold_policy()).fold(sequence)
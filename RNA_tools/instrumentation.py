@@ -0,0 +1,201 @@
+"""
+Timing spans and counters for pipeline runs.
+
+Off by default. While off, span() hands back one shared do-nothing context
+manager and count()/observe() return at once, so instrumented hot paths
+(every fold, every inverse_fold try) cost a function call and a flag check.
+
+    import instrumentation
+    instrumentation.enable()
+    with instrumentation.span("fold"):
+        ...
+    instrumentation.count("bytes_downloaded", len(data))
+    instrumentation.write_reports("metrics")  # run_report.json + metrics.prom
+
+Set RNA_TOOLS_METRICS=<dir> to turn it on for demo.py and write the
+reports there at the end of the run.
+
+Only the process that calls enable() records. Work done in process-pool
+workers is reported by the parent from what the workers return (tries per
+design trial, parse/fold/save times per analysed chain).
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Directory for the reports; setting it turns instrumentation on in demo.py
+METRICS_ENV = "RNA_TOOLS_METRICS"
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = "rna_tools"
+
+_NULL_SPAN = contextlib.nullcontext()
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# =========================
+# 1. Recorder
+# =========================
+
+class Recorder:
+    """
+    Collects span durations and counters for one run.
+
+    Spans are aggregated per (name, labels) into count / total / max
+    seconds; the first `max_events` individual spans are also kept, with
+    their start offset, for the per-candidate timeline in the JSON report.
+    """
+
+    def __init__(self, run_id=None, max_events=10000):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.started = time.time()
+        self.max_events = max_events
+        self.spans = {}
+        self.counters = {}
+        self.events = []
+        self.dropped_events = 0
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, start=None, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            agg = self.spans.get(key)
+            if agg is None:
+                agg = self.spans[key] = {"count": 0, "total": 0.0, "max": 0.0}
+            agg["count"] += 1
+            agg["total"] += seconds
+            agg["max"] = max(agg["max"], seconds)
+            if len(self.events) < self.max_events:
+                offset = (start if start is not None else time.time() - seconds) - self.started
+                self.events.append({"name": name, "labels": labels, "start": round(offset, 6),
+                                    "seconds": round(seconds, 6)})
+            else:
+                self.dropped_events += 1
+
+    def count(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        start = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, start=start, **labels)
+
+    def report(self):
+        """
+        The run as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "wall_seconds": round(time.time() - self.started, 6),
+                "spans": [dict(name=name, labels=dict(labels), count=agg["count"], total=round(agg["total"], 6),
+                               max=round(agg["max"], 6))
+                          for (name, labels), agg in sorted(self.spans.items())],
+                "counters": [dict(name=name, labels=dict(labels), value=value)
+                             for (name, labels), value in sorted(self.counters.items())],
+                "events": list(self.events),
+                "dropped_events": self.dropped_events,
+            }
+
+    def prometheus(self):
+        """
+        The aggregates in the Prometheus text exposition format.
+        """
+        def metric(name):
+            return f"{PROMETHEUS_PREFIX}_{name}".replace(".", "_").replace("-", "_")
+
+        def fmt_labels(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+        lines = [f"# HELP {PROMETHEUS_PREFIX}_span_seconds Time spent per pipeline stage",
+                 f"# TYPE {PROMETHEUS_PREFIX}_span_seconds summary"]
+        with self._lock:
+            for (name, labels), agg in sorted(self.spans.items()):
+                labels = (("span", name),) + labels
+                lines.append(f"{PROMETHEUS_PREFIX}_span_seconds_sum{fmt_labels(labels)} {agg['total']:.6f}")
+                lines.append(f"{PROMETHEUS_PREFIX}_span_seconds_count{fmt_labels(labels)} {agg['count']}")
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {metric(name)}_total counter")
+                    typed.add(name)
+                lines.append(f"{metric(name)}_total{fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+# =========================
+# 2. Module-level switch
+# =========================
+
+_recorder = None
+
+def enable(run_id=None, max_events=10000):
+    """
+    Start recording into a fresh Recorder and return it.
+    """
+    global _recorder
+    _recorder = Recorder(run_id, max_events)
+    return _recorder
+
+def disable():
+    """
+    Stop recording. Returns the Recorder that was active, if any.
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+def enabled():
+    return _recorder is not None
+
+def get_recorder():
+    return _recorder
+
+def span(name, **labels):
+    """
+    Context manager timing the enclosed block as `name`.
+    """
+    if _recorder is None:
+        return _NULL_SPAN
+    return _recorder.span(name, **labels)
+
+def observe(name, seconds, **labels):
+    """
+    Record a duration measured elsewhere (e.g. returned by a worker process).
+    """
+    if _recorder is not None:
+        _recorder.observe(name, seconds, **labels)
+
+def count(name, value=1, **labels):
+    if _recorder is not None:
+        _recorder.count(name, value, **labels)
+
+def write_reports(out_dir="metrics"):
+    """
+    Write run_report.json and metrics.prom for the active run into out_dir.
+    Returns the two paths, or None when instrumentation is off.
+    """
+    if _recorder is None:
+        return None
+    os.makedirs(out_dir, exist_ok=True)
+    json_path = os.path.join(out_dir, "run_report.json")
+    prom_path = os.path.join(out_dir, "metrics.prom")
+    with open(json_path, "w") as f:
+        json.dump(_recorder.report(), f, indent=2)
+    with open(prom_path, "w") as f:
+        f.write(_recorder.prometheus())
+    return json_path, prom_path
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+
+DEFAULT_CACHE_DIR = "model_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+class ModelCache:
+    """
+    Persistent, content-addressed store of 3D models.
+
+    Each model is keyed by the SHA-256 of the exact RNAComposer input
+    (see write_rnacomposer_input) and stored gzip-compressed as
+    <cache_dir>/<key[:2]>/<key>.pdb.gz. A file's mtime is its last use;
+    when the cache grows past `max_bytes` the least recently used models
+    are evicted first.
+
+    Args:
+        cache_dir (str): directory holding the cache
+        max_bytes (int): size limit for the compressed models
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(rc_input):
+        return hashlib.sha256(rc_input.encode()).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".pdb.gz")
+
+    def get(self, rc_input, out_path):
+        """
+        Write the cached model for `rc_input` to out_path.
+        Returns out_path on a hit, None on a miss.
+        """
+        cached = self.path_for(self.key(rc_input))
+        try:
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            tmp_path = out_path + ".part"
+            with gzip.open(cached, "rb") as src, open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, out_path)
+            os.utime(cached)
+        except (OSError, EOFError):
+            if os.path.exists(out_path + ".part"):
+                os.remove(out_path + ".part")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return out_path
+
+    def put(self, rc_input, pdb_path):
+        """
+        Store the model at pdb_path under `rc_input`, then enforce the size limit.
+        """
+        cached = self.path_for(self.key(rc_input))
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp_path = f"{cached}.{threading.get_ident()}.part"
+        with open(pdb_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, cached)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pdb.gz"):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Remove least recently used models until the cache fits in max_bytes.
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"Model cache: {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']:.0%} hit rate), {s['entries']} models, {s['bytes'] / 1e6:.1f} MB")
+
+_default_cache = None
+
+def get_default_cache():
+    """
+    Return the shared ModelCache in ./model_cache (created on first use).
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ModelCache()
+    return _default_cache
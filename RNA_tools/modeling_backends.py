@@ -0,0 +1,400 @@
+"""
+Pluggable 3D-modeling backends and a durable job queue in front of them.
+
+A backend turns one RNAComposer-style input (">name\\nsequence\\ndot-bracket",
+see write_rnacomposer_input) into a PDB file. Two are built in:
+
+  - RNAComposerBackend: the RNAComposer web server over plain HTTP
+    (or any stand-in at base_url, e.g. FakeRNAComposer)
+  - FakeBackend: an in-process stand-in with a delay and an optional
+    failure rate, for tests and dry runs
+
+JobQueue keeps every modeling job in SQLite with its status
+(queued / running / done / failed), attempts and last error. run() starts
+jobs with each backend's concurrency and rate limits, retries failures
+with exponential backoff, and yields each job as it finishes. Queued,
+running and failed jobs survive a crash; rerunning picks them up again and
+models that are already done are not redone, as long as their file still
+holds the model that was written (its SHA-256 is kept with the job).
+
+    queue = JobQueue("model_jobs.sqlite")
+    backend = RNAComposerBackend(max_concurrency=4, rate_per_minute=20)
+    for i, (seq, ss) in enumerate(inputs, start=1):
+        queue.submit(write_rnacomposer_input(seq, ss), f"pdb_files/new_RNA_{i}.pdb", backend.name)
+    for job in queue.run({backend.name: backend}):
+        print(job["id"], job["status"], job["out_path"])
+"""
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import instrumentation
+import rnacomposer
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def _digest(path):
+    # SHA-256 of a model file, or None if it is missing
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+DEFAULT_QUEUE_PATH = "model_jobs.sqlite"
+
+# =========================
+# 1. Backends
+# =========================
+
+class Backend:
+    """
+    Base class for a 3D-modeling service.
+
+    Args:
+        name (str): key the queue stores jobs under
+        max_concurrency (int): jobs running at once on this backend
+        rate_per_minute (float): job starts allowed per minute (None = no limit)
+        timeout (float): per-job limit in seconds, passed to model()
+    """
+
+    name = "backend"
+
+    def __init__(self, name=None, max_concurrency=4, rate_per_minute=None, timeout=600):
+        if name is not None:
+            self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate_per_minute = rate_per_minute
+        self.timeout = timeout
+
+    @property
+    def min_interval(self):
+        # seconds between two job starts
+        return 60.0 / self.rate_per_minute if self.rate_per_minute else 0.0
+
+    def model(self, rc_input, out_path):
+        """
+        Build the model for rc_input and write it to out_path. Returns
+        out_path; any exception counts as a failed attempt.
+        """
+        raise NotImplementedError
+
+
+class RNAComposerBackend(Backend):
+    """
+    RNAComposer over HTTP (rnacomposer.compose_one).
+
+    Args:
+        base_url (str): server address (point it at a local stand-in for tests)
+        session: requests session to reuse (default: the shared pooled session)
+        cache: optional model_cache.ModelCache consulted before submitting
+    """
+
+    name = "rnacomposer"
+
+    def __init__(self, base_url=rnacomposer.RNACOMPOSER_URL, session=None, cache=None, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+        self.session = session
+        self.cache = cache
+
+    def model(self, rc_input, out_path):
+        session = self.session or rnacomposer.get_session()
+        return rnacomposer.compose_one(session, rc_input, out_path, self.base_url, self.timeout, self.cache)
+
+
+class FakeBackend(Backend):
+    """
+    In-process stand-in: sleeps `delay` seconds and writes a toy helix
+    (fake_rnacomposer.fake_pdb). A share `fail_rate` of the attempts raises,
+    to exercise retries.
+    """
+
+    name = "fake"
+
+    def __init__(self, delay=0.0, fail_rate=0.0, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.attempts = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def model(self, rc_input, out_path):
+        from fake_rnacomposer import fake_pdb
+
+        with self._lock:
+            self.attempts += 1
+            fail = self._rng.random() < self.fail_rate
+        time.sleep(self.delay)
+        if fail:
+            raise RuntimeError("fake backend: simulated transient failure")
+        sequence = rc_input.splitlines()[1].strip()
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        tmp_path = out_path + ".part"
+        with open(tmp_path, "w") as f:
+            f.write(fake_pdb(sequence))
+        os.replace(tmp_path, out_path)
+        return out_path
+
+
+BACKENDS = {
+    RNAComposerBackend.name: RNAComposerBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+def make_backend(name, **kwargs):
+    """
+    Build a registered backend by name, e.g. make_backend("fake", delay=0.5).
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown modeling backend {name!r} (known: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name](**kwargs)
+
+# =========================
+# 2. Durable job queue
+# =========================
+
+class JobQueue:
+    """
+    SQLite-backed modeling queue.
+
+    Args:
+        path (str): SQLite file (":memory:" for a throwaway queue)
+        max_attempts (int): attempts per job before it is marked failed
+        base_delay, max_delay (float): backoff after the n-th failed attempt
+            is min(max_delay, base_delay * 2 ** (n - 1)) seconds, +-25 % jitter
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, max_attempts=4, base_delay=5.0, max_delay=300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY, backend TEXT, rc_input TEXT, out_path TEXT,"
+            " status TEXT, attempts INTEGER DEFAULT 0, next_attempt REAL DEFAULT 0,"
+            " error TEXT, created REAL, updated REAL, sha256 TEXT,"
+            " UNIQUE (backend, rc_input, out_path))"
+        )
+        if "sha256" not in {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}:
+            # queues written before model digests were kept: their done jobs are checked again
+            self._db.execute("ALTER TABLE jobs ADD COLUMN sha256 TEXT")
+        # jobs that were running when the last process died start over
+        self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    def submit(self, rc_input, out_path, backend):
+        """
+        Queue a job and return its id. Submitting the same (backend, input,
+        out_path) again returns the existing job; a failed one is queued
+        again with fresh attempts, and a done one whose file has gone missing
+        or no longer holds its model (another job wrote to the same path)
+        is redone.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT id, status, sha256 FROM jobs"
+                                   " WHERE backend = ? AND rc_input = ? AND out_path = ?",
+                                   (backend, rc_input, out_path)).fetchone()
+            if row is None:
+                cursor = self._db.execute(
+                    "INSERT INTO jobs (backend, rc_input, out_path, status, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", (backend, rc_input, out_path, QUEUED, now, now))
+                self._db.commit()
+                return cursor.lastrowid
+            if row["status"] == FAILED or (row["status"] == DONE and _digest(out_path) != row["sha256"]):
+                self._db.execute("UPDATE jobs SET status = ?, attempts = 0, next_attempt = 0, updated = ?"
+                                 " WHERE id = ?", (QUEUED, now, row["id"]))
+                self._db.commit()
+            return row["id"]
+
+    def job(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def jobs(self, status=None, backend=None):
+        sql, params = "SELECT * FROM jobs WHERE 1", []
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if backend is not None:
+            sql += " AND backend = ?"
+            params.append(backend)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql + " ORDER BY id", params)]
+
+    def counts(self):
+        """
+        Number of jobs per status.
+        """
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _claim(self, backend, job_ids, now):
+        # next queued job of this backend that is due, marked running
+        sql = "SELECT * FROM jobs WHERE backend = ? AND status = ? AND next_attempt <= ?"
+        params = [backend, QUEUED, now]
+        if job_ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params += list(job_ids)
+        with self._lock:
+            row = self._db.execute(sql + " ORDER BY next_attempt, id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                             (RUNNING, now, row["id"]))
+            self._db.commit()
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def _next_due(self, backends, job_ids):
+        # earliest retry time among queued jobs, or None when nothing is queued
+        sql = f"SELECT MIN(next_attempt) FROM jobs WHERE status = ? AND backend IN ({','.join('?' * len(backends))})"
+        params = [QUEUED] + list(backends)
+        if job_ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params += list(job_ids)
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    def _finish(self, job, error):
+        now = time.time()
+        if error is None:
+            self._execute("UPDATE jobs SET status = ?, error = NULL, sha256 = ?, updated = ? WHERE id = ?",
+                          (DONE, _digest(job["out_path"]), now, job["id"]))
+            return DONE
+        message = f"{type(error).__name__}: {error}"
+        if job["attempts"] >= self.max_attempts:
+            self._execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                          (FAILED, message, now, job["id"]))
+            return FAILED
+        delay = min(self.max_delay, self.base_delay * 2 ** (job["attempts"] - 1))
+        delay *= self._rng.uniform(0.75, 1.25)
+        self._execute("UPDATE jobs SET status = ?, error = ?, next_attempt = ?, updated = ? WHERE id = ?",
+                      (QUEUED, message, now + delay, now, job["id"]))
+        return QUEUED
+
+    def run(self, backends, job_ids=None, poll=1.0):
+        """
+        Work off the queued jobs of the given backends ({name: Backend}),
+        optionally only those in job_ids, and yield each job dict once it
+        is done or has failed for good. Returns when nothing is queued or
+        running any more.
+        """
+        job_ids = None if job_ids is None else list(job_ids)
+        pools = {name: ThreadPoolExecutor(max_workers=b.max_concurrency) for name, b in backends.items()}
+        in_flight = {name: 0 for name in backends}
+        next_start = {name: 0.0 for name in backends}
+        running = {}
+        try:
+            while True:
+                now = time.time()
+                for name, backend in backends.items():
+                    while in_flight[name] < backend.max_concurrency and now >= next_start[name]:
+                        job = self._claim(name, job_ids, now)
+                        if job is None:
+                            break
+                        running[pools[name].submit(self._attempt, backend, job)] = job
+                        in_flight[name] += 1
+                        next_start[name] = now + backend.min_interval
+
+                if not running:
+                    due = self._next_due(backends, job_ids)
+                    if due is None:
+                        return
+                    # nothing in flight: sleep until a retry is due and its backend may start a job
+                    wake = min(max(due, next_start[name]) for name in backends)
+                    time.sleep(min(poll, max(0.01, wake - now)))
+                    continue
+
+                done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    in_flight[job["backend"]] -= 1
+                    status = self._finish(job, future.result())
+                    if status == QUEUED:
+                        instrumentation.count("modeling_retries", backend=job["backend"])
+                        print(f"Modeling job {job['id']} attempt {job['attempts']} failed, will retry: "
+                              f"{self.job(job['id'])['error']}")
+                        continue
+                    instrumentation.count("modeling_jobs", backend=job["backend"], status=status)
+                    yield self.job(job["id"])
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+    @staticmethod
+    def _attempt(backend, job):
+        # returns the exception instead of raising it, so run() can record it
+        try:
+            with instrumentation.span("modeling.attempt", backend=backend.name):
+                backend.model(job["rc_input"], job["out_path"])
+        except Exception as e:
+            return e
+        return None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =========================
+# 3. Batch helper
+# =========================
+
+def model_pdbs(rc_inputs, backend, queue=None, out_dir="pdb_files", start_index=1):
+    """
+    Queue rc_inputs on `backend` and yield (index, pdb_path) in completion
+    order, like rnacomposer.compose_pdbs; pdb_path is None for a job that
+    failed every attempt. Files are named new_RNA_{index}.pdb.
+    queue: JobQueue to use (default: DEFAULT_QUEUE_PATH in the working directory)
+    """
+    own_queue = queue is None
+    if own_queue:
+        queue = JobQueue(DEFAULT_QUEUE_PATH)
+    try:
+        ids = {}
+        for index, rc_input in enumerate(rc_inputs, start=start_index):
+            out_path = os.path.join(out_dir, f"new_RNA_{index}.pdb")
+            ids[queue.submit(rc_input, out_path, backend.name)] = index
+        # models finished by an earlier run are not redone
+        for job_id, index in ids.items():
+            job = queue.job(job_id)
+            if job["status"] == DONE:
+                yield index, job["out_path"]
+        for job in queue.run({backend.name: backend}, job_ids=ids):
+            if job["status"] == FAILED:
+                print(f"Modeling job {ids[job['id']]} failed after {job['attempts']} attempts: {job['error']}")
+            yield ids[job["id"]], job["out_path"] if job["status"] == DONE else None
+    finally:
+        if own_queue:
+            queue.close()
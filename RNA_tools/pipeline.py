@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import create_rna_data as cr
+import fold_service
+import process_rna_data as prd
+import rnacomposer
+import instrumentation
+from model_cache import get_default_cache
+
+# Marks the end of a stage's output
+_DONE = object()
+
+def run_pipeline(
+    scaffold_name,
+    n_candidates=5,
+    rng_seed=42,
+    design_workers=None,
+    max_in_flight=4,
+    analysis_workers=2,
+    queue_size=8,
+    output_root="MFE_test",
+    pdb_dir="pdb_files",
+    base_url=rnacomposer.RNACOMPOSER_URL,
+    cache=None,
+    timeout=600,
+    ensemble_filter=None,
+):
+    """
+    Streaming design -> 3D model -> analysis run for one scaffold.
+
+    The three stages run at the same time, connected by bounded queues:
+      - design: streams design trials and forwards every perfect design
+        (bp_distance == 0) at once; when the trials run out, the best of the
+        remaining designs fill up to n_candidates. Trials stop as soon as
+        n_candidates perfect designs are found.
+      - model: keeps up to `max_in_flight` RNAComposer jobs running
+        (cached models are reused, see model_cache; cache=False disables it)
+      - analysis: runs analyze_structure_file on `analysis_workers` processes
+    With an ensemble_filter (ensemble_filter.EnsembleFilter), designs are
+    scored on their ensemble as they arrive (on the filter's worker pool,
+    see EnsembleFilter.stream) and only those passing the filter's
+    thresholds are modeled, at most top_k of them.
+    The best-MFE result is updated and printed as analyses finish, so the
+    total wall time tends towards that of the slowest stage.
+
+    Returns a dict with candidates, records, best, per-stage timings and the
+    ensemble filter report (None without a filter).
+    """
+    if cache is None:
+        cache = get_default_cache()
+    session = rnacomposer.get_session()
+    design_q = queue.Queue(maxsize=queue_size)
+    model_q = queue.Queue(maxsize=queue_size)
+
+    candidates = []
+    records = []
+    state = {"best": None}
+    lock = threading.Lock()
+    timings = {"design": 0.0, "model": 0.0, "analysis": 0.0}
+    # the stages run in threads, so worker processes are spawned rather than
+    # forked: a fork could copy a lock another stage holds (fold cache,
+    # instrumentation, sqlite) into the child
+    spawn = multiprocessing.get_context("spawn")
+    t_start = time.perf_counter()
+
+    def design_stage():
+        t0 = time.perf_counter()
+        wanted = n_candidates
+        if ensemble_filter is not None and ensemble_filter.top_k is not None:
+            wanted = min(wanted, ensemble_filter.top_k)
+        considered = 0
+        try:
+            leftovers = []
+            trials = cr.iter_candidates_for_scaffold(scaffold_name, n_candidates, rng_seed, design_workers,
+                                                     mp_context=spawn)
+            # with a filter, designs are scored on its worker pool while the trials go on
+            scored = trials if ensemble_filter is None else ensemble_filter.stream(trials, mp_context=spawn)
+            try:
+                for candidate in scored:
+                    if ensemble_filter is not None:
+                        considered += 1
+                        if not ensemble_filter.passes(candidate):
+                            continue
+                    if candidate["bp_distance"] == 0:
+                        candidates.append(candidate)
+                        design_q.put((len(candidates), candidate))
+                        if len(candidates) == wanted:
+                            break
+                    else:
+                        leftovers.append(candidate)
+            finally:
+                scored.close()
+                trials.close()
+            leftovers.sort(key=lambda c: (c["bp_distance"], c["mfe"]))
+            for candidate in leftovers[:wanted - len(candidates)]:
+                candidates.append(candidate)
+                design_q.put((len(candidates), candidate))
+            if ensemble_filter is not None:
+                ensemble_filter.record(len(candidates), considered)
+            cr.save_candidates(scaffold_name, candidates)
+        finally:
+            timings["design"] = time.perf_counter() - t0
+            design_q.put(_DONE)
+
+    def model_one(counter, candidate):
+        rc_input = cr.write_rnacomposer_input(candidate["sequence"], candidate["predicted_ss"])
+        out_path = os.path.join(pdb_dir, f"new_RNA_{counter}.pdb")
+        try:
+            path = rnacomposer.compose_one(session, rc_input, out_path, base_url, timeout, cache or None)
+        except Exception as e:
+            print(f"RNAComposer job {counter} failed: {e}")
+            path = None
+        model_q.put((counter, path))
+
+    def model_stage():
+        t0 = time.perf_counter()
+        slots = threading.Semaphore(max_in_flight)
+        try:
+            with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+                while True:
+                    item = design_q.get()
+                    if item is _DONE:
+                        break
+                    slots.acquire()
+                    future = pool.submit(model_one, *item)
+                    future.add_done_callback(lambda f: slots.release())
+        finally:
+            timings["model"] = time.perf_counter() - t0
+            model_q.put(_DONE)
+
+    def analysed(future):
+        try:
+            new_records = prd.observe_records(future.result())
+        except Exception as e:
+            print(f"Analysis failed: {e}")
+            return
+        with lock:
+            # workers fold with their own copy of the policy; count their modes here
+            fold_service.get_fold_policy().merge(new_records)
+        for record in new_records:
+            with lock:
+                records.append(record)
+                if record["error"] is not None:
+                    continue
+                best = state["best"]
+                if best is None or record["mfe"] < best["mfe"]:
+                    state["best"] = record
+                    print(f"New best: {record['file']} chain {record['chain']} (MFE: {record['mfe']:.2f})")
+
+    def analysis_stage():
+        t0 = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=analysis_workers, mp_context=spawn) as pool:
+                while True:
+                    item = model_q.get()
+                    if item is _DONE:
+                        break
+                    counter, path = item
+                    if path is None:
+                        continue
+                    out_dir = os.path.join(output_root, f"output_{os.path.basename(path)}")
+                    future = pool.submit(prd._analyze_job, (path, out_dir, True, None))
+                    future.add_done_callback(analysed)
+        finally:
+            timings["analysis"] = time.perf_counter() - t0
+
+    threads = [threading.Thread(target=stage, name=stage.__name__)
+               for stage in (design_stage, model_stage, analysis_stage)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    timings["wall"] = time.perf_counter() - t_start
+    for name, seconds in timings.items():
+        instrumentation.observe(f"pipeline.{name}", seconds, scaffold=scaffold_name)
+
+    print("Stage times: " + ", ".join(f"{name} {seconds:.1f} s" for name, seconds in timings.items()))
+    if ensemble_filter is not None:
+        ensemble_filter.print_report()
+    return {
+        "candidates": candidates,
+        "records": records,
+        "best": state["best"],
+        "timings": timings,
+        "prefilter": ensemble_filter.report() if ensemble_filter is not None else None,
+    }
@@ -1,125 +1,454 @@
 
 import os
-import subprocess
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from Bio.PDB import MMCIFParser, PDBParser
-from Bio.PDB.PDBExceptions import PDBException
-import RNA 
+import sys
+import time
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import fold_service
+import instrumentation
+from structure_sequences import extract_chain_sequences
 
 def plot_arc_diagram(ss, sequence, output_png_path):
     """
     Generates and saves an arc plot of the RNA secondary structure using matplotlib.
+    All arcs are drawn as one collection on an Agg canvas and tick labels are
+    thinned for long sequences (see arc_plots.render_arc_plot).
     """
-    fig, ax = plt.subplots()
-    ax.plot(range(len(sequence)), [0] * len(sequence), 'o-', color='gray', markersize=2)
-
-    stack = []
-    for i, char in enumerate(ss):
-        if char == '(':
-            stack.append(i)
-        elif char == ')':
-            if stack:
-                j = stack.pop()
-                arc = patches.Arc(((i + j) / 2, 0), width=i - j, height=(i - j) / 2,
-                              theta1=0, theta2=180, edgecolor='blue', lw=1)
-                ax.add_patch(arc)
-
-    ax.set_yticks([])
-    ax.set_xticks(range(len(sequence)))
-    ax.set_xticklabels(list(sequence))
-    ax.set_xlim(-1, len(sequence))
-    ax.set_ylim(-5, len(sequence) / 2)
-    ax.set_aspect('equal')
-    plt.title("RNA Secondary Structure Arc Plot")
-    plt.savefig(output_png_path)
-    plt.close()
+    # matplotlib is loaded on the first plot, not with the module
+    from arc_plots import render_arc_plot
 
-def process_structure_file(file_path, output_dir="output"):
+    render_arc_plot(ss, sequence, output_png_path)
+
+def observe_records(records):
     """
-    Parses a .cif or .pdb file, predicts secondary structure, saves the data, and generates a visualization.
+    Report the timings of analysis records to instrumentation (parse once
+    per file, fold and save per chain) and count failed files.
+    Returns records unchanged.
+    """
+    if not instrumentation.enabled():
+        return records
+    seen = set()
+    for record in records:
+        name = os.path.basename(record["file"])
+        if record["error"] is not None:
+            instrumentation.count("analysis_errors")
+            continue
+        if record["file"] not in seen:
+            seen.add(record["file"])
+            instrumentation.observe("analysis.parse", record["parse_time"], file=name)
+        instrumentation.observe("analysis.fold", record["fold_time"], file=name, chain=record["chain"])
+        instrumentation.observe("analysis.save", record["save_time"], file=name, chain=record["chain"])
+    return records
+
+def _parse_errors():
+    # PDBException can only come from Biopython, so it is looked up only once
+    # the fallback reader has loaded it instead of importing Biopython here
+    pdb_exceptions = sys.modules.get("Bio.PDB.PDBExceptions")
+    if pdb_exceptions is None:
+        return (ValueError,)
+    return (pdb_exceptions.PDBException, ValueError)
+
+def _quiet(*args, **kwargs):
+    pass
+
+def analyze_structure_file(file_path, output_dir="output", plot=True, energy_file=None, verbose=True,
+                           reader="stream", policy=None):
+    """
+    Parses a .cif or .pdb file, predicts the secondary structure of every chain,
+    saves the data and (optionally) an arc plot.
 
     Args:
         file_path (str): Path to PDB or CIF structure file
         output_dir (str): Directory to save output files (default: "output")
+        plot (bool): Generate an arc plot per chain
+        energy_file (str): If given, each chain's MFE is also appended to this file
+        verbose (bool): Print progress messages
+        reader (str): How chain sequences are read, see
+            structure_sequences.extract_chain_sequences ("stream", "gemmi" or "biopython")
+        policy (fold_service.FoldPolicy): how long chains are folded
+            (default: fold_service.get_fold_policy())
 
-    Example usage:
-        process_structure_file("Predict.pdb")
-        process_structure_file("structure.cif", "my_results")
+    Returns a list of result dicts, one per chain, with keys
+    file, chain, sequence, structure, mfe, fold_mode, fold_fallback, length,
+    parse_time, fold_time, save_time and error. A file that cannot be read gives a single record
+    with chain None and the reason in error.
     """
+    log = print if verbose else _quiet
+
+    def failure(message):
+        print(f"Error: {message}")
+        return observe_records([{"file": file_path, "chain": None, "sequence": None, "structure": None,
+                 "mfe": None, "fold_mode": None, "fold_fallback": None, "length": 0, "parse_time": 0.0,
+                 "fold_time": 0.0, "save_time": 0.0, "error": message}])
+
     if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
-        return
+        return failure(f"File not found at {file_path}")
 
-    # Determine file type and choose appropriate parser
+    # Determine file type
     file_extension = file_path.lower().split('.')[-1]
 
-    if file_extension == 'cif':
-        parser = MMCIFParser()
-        print(f"Using MMCIFParser for {file_path}")
-    elif file_extension == 'pdb':
-        parser = PDBParser()
-        print(f"Using PDBParser for {file_path}")
-    else:
-        print(f"Error: Unsupported file format '{file_extension}'. Only .cif and .pdb files are supported.")
-        return
+    if file_extension not in ('cif', 'pdb'):
+        return failure(f"Unsupported file format '{file_extension}'. Only .cif and .pdb files are supported.")
+    log(f"Reading chain sequences from {file_path} ({reader} reader)")
 
+    t0 = time.perf_counter()
     try:
-        structure = parser.get_structure("RNA_structure", file_path)
-    except PDBException as e:
-        print(f"Error parsing {file_path}: {e}")
-        return
+        chain_sequences = extract_chain_sequences(file_path, reader)
+    except _parse_errors() as e:
+        return failure(f"parsing {file_path}: {e}")
+    parse_time = time.perf_counter() - t0
+    structure_id = "RNA_structure"
 
-    print(f"Successfully parsed {file_path}")
-    print(f"Structure ID: {structure.id}")
+    log(f"Successfully parsed {file_path}")
+    log(f"Structure ID: {structure_id}")
 
     os.makedirs(output_dir, exist_ok=True)
 
-    for chain in structure.get_chains():
-        print(f"Processing chain {chain.id}...")
-
-        # Extract sequence
-        sequence = ""
-        for residue in chain.get_residues():
-            if residue.get_resname().strip() in ("A", "U", "G", "C"):
-                sequence += residue.get_resname().strip()
+    records = []
+    for chain_id, sequence in chain_sequences.items():
+        log(f"Processing chain {chain_id}...")
 
         if not sequence:
-            print(f"No standard RNA sequence found for chain {chain.id}")
-            continue
-        
-        """
-        if len(sequence) > 300:
-            print("Sequence is too long for arc plot visualization, skipping.")
+            log(f"No standard RNA sequence found for chain {chain_id}")
             continue
-        """
-        print(f"Sequence: {sequence}")
 
-        (ss, energy) = RNA.fold(sequence)
-        print(f"Secondary Structure: {ss} (MFE: {energy:.2f})")
+        log(f"Sequence: {sequence}")
+
+        t0 = time.perf_counter()
+        (ss, energy, fold_mode, fold_fallback) = fold_service.fold_chain(sequence, policy)
+        fold_time = time.perf_counter() - t0
+        log(f"Secondary Structure: {ss} (MFE: {energy:.2f}, {fold_mode} fold)")
 
-        sequence_output_path = os.path.join(output_dir, f"{structure.id}_{chain.id}_sequence.txt")
+        t0 = time.perf_counter()
+        sequence_output_path = os.path.join(output_dir, f"{structure_id}_{chain_id}_sequence.txt")
         with open(sequence_output_path, "w") as f:
             f.write(sequence)
-        print(f"Sequence saved to {sequence_output_path}")
+        log(f"Sequence saved to {sequence_output_path}")
 
-        structure_output_path = os.path.join(output_dir, f"{structure.id}_{chain.id}_secondary_structure.txt")
-        os.makedirs("analysis", exist_ok=True)
+        structure_output_path = os.path.join(output_dir, f"{structure_id}_{chain_id}_secondary_structure.txt")
         with open(structure_output_path, "w") as f:
-            with open("analysis/energy.txt", "a") as e:
-                f.write(f"Sequence: {sequence}\n")
-                f.write(f"Secondary Structure: {ss}\n")
-                f.write(f"MFE: {energy:.2f}\n")
+            f.write(f"Sequence: {sequence}\n")
+            f.write(f"Secondary Structure: {ss}\n")
+            f.write(f"MFE: {energy:.2f}\n")
+            f.write(f"Fold mode: {fold_mode}\n")
+        if energy_file is not None:
+            os.makedirs(os.path.dirname(energy_file) or ".", exist_ok=True)
+            with open(energy_file, "a") as e:
                 e.write(f"{energy:.2f}\n")
-        print(f"Secondary structure and MFE saved to {structure_output_path}")
+        log(f"Secondary structure and MFE saved to {structure_output_path}")
+
+        if plot:
+            log("Generating visualization...")
+            try:
+                png_output_path = os.path.join(output_dir, f"{structure_id}_{chain_id}_structure_arc_plot.png")
+                with instrumentation.span("analysis.plot"):
+                    plot_arc_diagram(ss, sequence, png_output_path)
+                log(f"Visualization saved to {png_output_path}")
+            except Exception as e:
+                print(f"An unexpected error occurred during visualization: {e}")
+        save_time = time.perf_counter() - t0
+
+        records.append({
+            "file": file_path,
+            "chain": chain_id,
+            "sequence": sequence,
+            "structure": ss,
+            "mfe": energy,
+            "fold_mode": fold_mode,
+            "fold_fallback": fold_fallback,
+            "length": len(sequence),
+            "parse_time": parse_time,
+            "fold_time": fold_time,
+            "save_time": save_time,
+            "error": None,
+        })
+    return observe_records(records)
+
+def process_structure_file(file_path, output_dir="output"):
+    """
+    Parses a .cif or .pdb file, predicts secondary structure, saves the data, and generates a visualization.
+    Each chain's MFE is also appended to analysis/energy.txt.
+
+    Args:
+        file_path (str): Path to PDB or CIF structure file
+        output_dir (str): Directory to save output files (default: "output")
+
+    Returns the per-chain records of analyze_structure_file().
+
+    Example usage:
+        process_structure_file("Predict.pdb")
+        process_structure_file("structure.cif", "my_results")
+    """
+    return analyze_structure_file(file_path, output_dir, energy_file="analysis/energy.txt")
+
+def _analyze_job(args):
+    file_path, output_dir, plot, policy = args
+    return analyze_structure_file(file_path, output_dir, plot=plot, verbose=False, policy=policy)
+
+def analyze_structure_files(file_paths, output_root="MFE_test", workers=None, plot=True, policy=None):
+    """
+    Batch version of analyze_structure_file: parse + fold + save for many
+    files, spread over a process pool.
+
+    Args:
+        file_paths (list): PDB/CIF files to analyse
+        output_root (str): each file's outputs go to <output_root>/output_<file name>
+        workers (int): None or 1 runs serially, N > 1 uses N processes
+        plot (bool): Generate arc plots
+        policy (fold_service.FoldPolicy): how long chains are folded; workers
+            fold with a frozen copy and their mode counts are merged into it
+
+    Returns one record per (file, chain) in input order (see analyze_structure_file).
+    No shared energy file is written.
+    """
+    jobs = [(path, os.path.join(output_root, f"output_{os.path.basename(path)}"), plot, policy)
+            for path in file_paths]
+    if workers is None or workers <= 1:
+        results = map(_analyze_job, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # workers do not record; report what they measured from here
+            results = [observe_records(records) for records in pool.map(_analyze_job, jobs)]
+        for records in results:
+            (policy or fold_service.get_fold_policy()).merge(records)
+    return [record for records in results for record in records]
+
+def most_stable(records):
+    """
+    Return the successfully analysed record with the lowest MFE, or None.
+    """
+    ok = [r for r in records if r["error"] is None]
+    return min(ok, key=lambda r: r["mfe"]) if ok else None
+
+# =========================
+# Dataset mode
+# =========================
 
-        print("Generating visualization...")
+STRUCTURE_EXTENSIONS = (".pdb", ".cif")
+
+def iter_structure_files(root):
+    """
+    Yield every .pdb / .cif file under `root`, in a stable (sorted) order.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(STRUCTURE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+def file_digest(path, block_size=1 << 20):
+    """
+    SHA-256 of a file's content.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class ResultsDB:
+    """
+    One SQLite database for the analysis of a whole dataset.
+
+    Tables:
+      files   one row per structure file: path, content hash, size, mtime,
+              number of chains, error, time of analysis
+      chains  one row per chain: path, chain, sequence, structure, mfe, length,
+              fold mode
+    with indexes on the hash, MFE and length.
+
+    Args:
+        path (str): SQLite file
+    """
+
+    def __init__(self, path="analysis.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, mtime_ns INTEGER,"
+            " chains INTEGER, error TEXT, analysed REAL);"
+            "CREATE TABLE IF NOT EXISTS chains ("
+            " path TEXT, chain TEXT, sequence TEXT, structure TEXT, mfe REAL, length INTEGER, fold_mode TEXT,"
+            " PRIMARY KEY (path, chain));"
+            "CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);"
+            "CREATE INDEX IF NOT EXISTS chains_mfe ON chains (mfe);"
+            "CREATE INDEX IF NOT EXISTS chains_length ON chains (length);"
+        )
+        if "fold_mode" not in {row[1] for row in self._db.execute("PRAGMA table_info(chains)")}:
+            # databases written before fold modes were recorded (all global folds)
+            self._db.execute("ALTER TABLE chains ADD COLUMN fold_mode TEXT DEFAULT 'global'")
+        self._db.commit()
+
+    def known(self):
+        """
+        {path: (sha256, size, mtime_ns)} of every file analysed so far.
+        """
+        return {path: (digest, size, mtime_ns)
+                for path, digest, size, mtime_ns in self._db.execute("SELECT path, sha256, size, mtime_ns FROM files")}
+
+    def touch(self, path, size, mtime_ns):
+        # same content under a new mtime: remember the mtime so the next run skips it without hashing
+        self._db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+
+    def put(self, path, digest, size, mtime_ns, records):
+        """
+        Replace everything stored for `path` by these analysis records.
+        """
+        ok = [r for r in records if r["error"] is None]
+        error = next((r["error"] for r in records if r["error"] is not None), None)
+        self._db.execute("DELETE FROM chains WHERE path = ?", (path,))
+        self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (path, digest, size, mtime_ns, len(ok), error, time.time()))
+        self._db.executemany("INSERT OR REPLACE INTO chains VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(path, r["chain"], r["sequence"], r["structure"], r["mfe"], r["length"],
+                               r["fold_mode"]) for r in ok])
+
+    def commit(self):
+        self._db.commit()
+
+    def query(self, sql, params=()):
+        """
+        Run a read query, e.g. db.query("SELECT * FROM chains WHERE length > ? ORDER BY mfe", (100,)).
+        """
+        return self._db.execute(sql, params).fetchall()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def analyze_chains(file_path, plot_dir=None, reader="stream", policy=None):
+    """
+    Fold every chain of one structure file without writing per-chain text
+    files. Arc plots go to <plot_dir>/<file name>_<chain>.png if plot_dir is
+    given. Returns records like analyze_structure_file's (save_time is the
+    plot time).
+    """
+    def failure(message):
+        return [{"file": file_path, "chain": None, "sequence": None, "structure": None, "mfe": None,
+                 "fold_mode": None, "fold_fallback": None, "length": 0, "parse_time": 0.0, "fold_time": 0.0, "save_time": 0.0, "error": message}]
+
+    t0 = time.perf_counter()
+    try:
+        chain_sequences = extract_chain_sequences(file_path, reader)
+    except Exception as e:
+        # one malformed entry (Biopython can also raise KeyError) must not stop a dataset run
+        return failure(f"parsing {file_path}: {type(e).__name__}: {e}")
+    parse_time = time.perf_counter() - t0
+
+    records = []
+    for chain_id, sequence in chain_sequences.items():
+        if not sequence:
+            continue
+        t0 = time.perf_counter()
+        ss, energy, fold_mode, fold_fallback = fold_service.fold_chain(sequence, policy)
+        fold_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        if plot_dir is not None:
+            try:
+                os.makedirs(plot_dir, exist_ok=True)
+                plot_arc_diagram(ss, sequence, os.path.join(plot_dir, f"{os.path.basename(file_path)}_{chain_id}.png"))
+            except Exception as e:
+                print(f"Arc plot of {file_path} chain {chain_id} failed: {e}")
+        records.append({"file": file_path, "chain": chain_id, "sequence": sequence, "structure": ss, "mfe": energy,
+                        "fold_mode": fold_mode, "fold_fallback": fold_fallback, "length": len(sequence), "parse_time": parse_time, "fold_time": fold_time,
+                        "save_time": time.perf_counter() - t0, "error": None})
+    return records
+
+def _dataset_job(args):
+    # hashes the file and, unless its content is already in the database, analyses it
+    path, old_digest, plot_dir, reader, policy = args
+    digest = file_digest(path)
+    if digest == old_digest:
+        return path, digest, None
+    return path, digest, analyze_chains(path, plot_dir, reader, policy)
+
+def analyze_dataset(root, db_path="analysis.sqlite", workers=None, plot_dir=None, reader="stream",
+                    commit_every=200, verbose=True, policy=None):
+    """
+    Analyse every .pdb / .cif file under `root` into one results database.
+
+    Files whose size and mtime match the database are skipped without being
+    read; the others are hashed, and only those whose content hash changed
+    (or that are new) are parsed and folded again.
+
+    Args:
+        root (str): directory tree to walk
+        db_path (str): ResultsDB file
+        workers (int): None or 1 runs serially, N > 1 uses N processes
+        plot_dir (str): write arc plots here (default: no plots)
+        reader (str): chain reader, see structure_sequences.extract_chain_sequences
+        commit_every (int): files per database transaction
+        verbose (bool): print progress every commit
+        policy (fold_service.FoldPolicy): how long chains are folded; workers
+            fold with a frozen copy and their mode counts are merged into it
+
+    Returns a summary dict: files, analysed, unchanged, failed, chains,
+    fold_modes (chains per fold mode) and seconds.
+    """
+    t_start = time.perf_counter()
+    summary = {"files": 0, "analysed": 0, "unchanged": 0, "failed": 0, "chains": 0, "fold_modes": {}}
+    with ResultsDB(db_path) as db:
+        known = db.known()
+        stats = {}
+        jobs = []
+        for path in iter_structure_files(root):
+            summary["files"] += 1
+            st = os.stat(path)
+            stats[path] = (st.st_size, st.st_mtime_ns)
+            old = known.get(path)
+            if old is not None and old[1:] == stats[path]:
+                summary["unchanged"] += 1
+                continue
+            jobs.append((path, old[0] if old else None, plot_dir, reader, policy))
+
+        pool = None
+        if workers is None or workers <= 1:
+            results = map(_dataset_job, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(_dataset_job, jobs, chunksize=max(1, min(64, len(jobs) // (workers * 8))))
         try:
-            png_output_path = os.path.join(output_dir, f"{structure.id}_{chain.id}_structure_arc_plot.png")
-            plot_arc_diagram(ss, sequence, png_output_path)
-            print(f"Visualization saved to {png_output_path}")
-        except Exception as e:
-            print(f"An unexpected error occurred during visualization: {e}")
+            for done, (path, digest, records) in enumerate(results, start=1):
+                size, mtime_ns = stats[path]
+                if records is None:
+                    db.touch(path, size, mtime_ns)
+                    summary["unchanged"] += 1
+                else:
+                    observe_records(records)
+                    if pool is not None:
+                        (policy or fold_service.get_fold_policy()).merge(records)
+                    db.put(path, digest, size, mtime_ns, records)
+                    summary["analysed"] += 1
+                    summary["failed"] += any(r["error"] is not None for r in records)
+                    summary["chains"] += sum(r["error"] is None for r in records)
+                    for r in records:
+                        if r["error"] is None:
+                            summary["fold_modes"][r["fold_mode"]] = summary["fold_modes"].get(r["fold_mode"], 0) + 1
+                if done % commit_every == 0:
+                    db.commit()
+                    if verbose:
+                        print(f"{done}/{len(jobs)} files processed ({time.perf_counter() - t_start:.0f} s)")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    summary["seconds"] = round(time.perf_counter() - t_start, 3)
+    if verbose:
+        print(f"Dataset {root}: {summary['files']} files, {summary['analysed']} analysed "
+              f"({summary['chains']} chains, {summary['failed']} failed), {summary['unchanged']} unchanged, "
+              f"{summary['seconds']:.1f} s -> {db_path}")
+        if summary["fold_modes"]:
+            print("Fold modes: " + ", ".join(f"{n} {mode}" for mode, n in sorted(summary["fold_modes"].items())))
+    return summary
 
 # Legacy function for backward compatibility
 def process_cif_file(cif_file_path, output_dir="output"):
@@ -139,6 +468,31 @@ if __name__ == "__main__":
 
     import sys
 
+    # Dataset mode: python process_rna_data.py --dataset ROOT [--db analysis.sqlite] [--workers N] [--plots DIR]
+    if len(sys.argv) > 1 and sys.argv[1] == "--dataset":
+        import argparse
+
+        parser = argparse.ArgumentParser(description="Analyse every PDB/mmCIF file under a directory tree "
+                                                     "into one results database.")
+        parser.add_argument("--dataset", required=True, metavar="ROOT", help="directory tree to walk")
+        parser.add_argument("--db", default="analysis.sqlite", help="results database")
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--plots", metavar="DIR", help="also write arc plots to DIR")
+        parser.add_argument("--reader", choices=["stream", "gemmi", "biopython"], default="stream")
+        parser.add_argument("--max-bp-span", type=int, help="largest pair span of the span mode (e.g. 300)")
+        parser.add_argument("--span-length", type=int, help="longer chains use the span mode (e.g. 1000)")
+        parser.add_argument("--window", type=int, default=200, help="window of the local mode")
+        parser.add_argument("--local-length", type=int, help="longer chains are folded locally (e.g. 4000)")
+        parser.add_argument("--time-budget", type=float, help="predicted seconds allowed per chain (e.g. 60)")
+        parser.add_argument("--memory-budget", type=float, help="predicted MB allowed per chain (e.g. 2048)")
+        args = parser.parse_args()
+        policy = fold_service.FoldPolicy(max_bp_span=args.max_bp_span, span_length=args.span_length,
+                                         window=args.window, local_length=args.local_length,
+                                         time_budget=args.time_budget, memory_budget=args.memory_budget)
+        analyze_dataset(args.dataset, args.db, workers=args.workers, plot_dir=args.plots, reader=args.reader,
+                        policy=policy)
+        sys.exit(0)
+
     # Check for command line arguments
     if len(sys.argv) > 1:
         input_file = sys.argv[1]
@@ -160,6 +514,7 @@ if __name__ == "__main__":
             print(f"Please provide a PDB or CIF file as argument:")
             print(f"  python {sys.argv[0]} your_structure.pdb")
             print(f"  python {sys.argv[0]} your_structure.cif")
+            print(f"  python {sys.argv[0]} --dataset path/to/mmcifs --db analysis.sqlite")
             sys.exit(1)
 
         output_dir = "output"
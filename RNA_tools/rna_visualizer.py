@@ -1,17 +1,40 @@
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-def represent(path_to_file):
-    driver = webdriver.Chrome()
-    driver.get("https://molstar.org/viewer")
+import instrumentation
+import webdriver_pool
+
+MOLSTAR_URL = "https://molstar.org/viewer"
+
+def represent(path_to_file, driver=None, viewer_url=MOLSTAR_URL, pool=None):
+    """
+    Open one structure file, or a list of them, in one Mol*Star viewer
+    session; several files are uploaded together and shown in the same
+    scene for comparison.
+    driver: Selenium driver to use (default: a session taken from `pool`,
+        or else a new visible Chrome window);
+        fake_molstar.FakeMolstarDriver runs the same steps offline
+    pool: webdriver_pool.DriverPool to take the session from, e.g.
+        DriverPool(size=1, headless=False). The session stays checked out
+        so the viewer remains open; hand it back with pool.release(driver).
+    Returns the driver.
+    """
+    # selenium is only loaded when a structure is actually shown
+    from selenium.webdriver.common.by import By
+
+    paths = [path_to_file] if isinstance(path_to_file, (str, os.PathLike)) else list(path_to_file)
+    with instrumentation.span("molstar.page_load"):
+        if driver is None:
+            # the viewer is interactive: without a pool it gets its own window on screen
+            driver = pool.acquire() if pool is not None else webdriver_pool.chrome(headless=False)
+        driver.get(viewer_url)
 
     # Getting rid of a button
     driver.find_element(By.CSS_SELECTOR,"button[title='Load a structure from the provided source and create its representation.']").click()
     # Finding the file input area
     driver.find_element(By.CSS_SELECTOR,"button[title='Load one or more files and optionally create default visuals']").click()
     file_input = driver.find_element(By.CSS_SELECTOR, "input[type='file']")
-    file_input.send_keys(os.path.abspath(path_to_file))
-    driver.find_element(By.CSS_SELECTOR, "button[class='msp-btn msp-btn-block msp-btn-commit msp-btn-commit-on']").click()
\ No newline at end of file
+    with instrumentation.span("molstar.upload", files=len(paths)):
+        # newline-separated paths upload several files through one input
+        file_input.send_keys("\n".join(os.path.abspath(path) for path in paths))
+        driver.find_element(By.CSS_SELECTOR, "button[class='msp-btn msp-btn-block msp-btn-commit msp-btn-commit-on']").click()
+    return driver
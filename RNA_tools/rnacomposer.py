@@ -0,0 +1,227 @@
+import os
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import instrumentation
+
+RNACOMPOSER_URL = "https://rnacomposer.cs.put.poznan.pl"
+
+# =========================
+# 1. HTTP session
+# =========================
+
+_session = None
+
+def make_session(pool_size=8):
+    """
+    Create a requests session whose connection pool can hold `pool_size`
+    keep-alive connections per host, so concurrent jobs reuse sockets.
+    """
+    # imported here so design-only runs never load requests
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session():
+    """
+    Return the module-wide pooled session (created on first use).
+    """
+    global _session
+    if _session is None:
+        _session = make_session()
+    return _session
+
+# =========================
+# 2. Page parsing
+# =========================
+
+class _ComposerPageParser(HTMLParser):
+    """
+    Collects what we need from an RNAComposer page: the compose form
+    (action, hidden fields, textarea name, submit button) and all links.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.form_action = None
+        self.fields = {}
+        self.textarea_name = None
+        self.links = []
+        self._in_form = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+        elif tag == "form" and self.form_action is None:
+            self.form_action = attrs.get("action", "")
+            self._in_form = True
+        elif not self._in_form:
+            return
+        elif tag == "textarea" and attrs.get("id") in ("sequence", "input"):
+            self.textarea_name = attrs.get("name") or attrs.get("id")
+        elif tag == "input" and attrs.get("name"):
+            input_type = attrs.get("type", "text").lower()
+            if input_type == "hidden" or attrs.get("value") == "Compose":
+                self.fields[attrs["name"]] = attrs.get("value", "")
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._in_form = False
+
+def _parse_page(html):
+    parser = _ComposerPageParser()
+    parser.feed(html)
+    return parser
+
+def find_pdb_link(html, page_url):
+    """
+    Return the absolute URL of the Predict.pdb link on a result page, or None.
+    """
+    for href in _parse_page(html).links:
+        if "Predict.pdb" in href:
+            return urljoin(page_url, href)
+    return None
+
+# =========================
+# 3. Single job steps
+# =========================
+
+def submit_job(session, rc_input, base_url=RNACOMPOSER_URL, timeout=60):
+    """
+    Fill in and post the compose form.
+    Returns (job_page_url, job_page_html) after redirects.
+    """
+    r = session.get(base_url, timeout=timeout)
+    r.raise_for_status()
+    page = _parse_page(r.text)
+    if page.form_action is None or page.textarea_name is None:
+        raise RuntimeError(f"No compose form found at {base_url}")
+
+    data = dict(page.fields)
+    data[page.textarea_name] = rc_input
+    r = session.post(urljoin(r.url, page.form_action), data=data, timeout=timeout)
+    r.raise_for_status()
+    return r.url, r.text
+
+def wait_for_pdb_url(session, job_url, html=None, timeout=600,
+                     initial_delay=2.0, max_delay=30.0, backoff=1.5):
+    """
+    Poll the job page until the Predict.pdb link shows up.
+    The delay between polls grows geometrically from `initial_delay` up to
+    `max_delay`; raises TimeoutError after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if html is not None:
+            pdb_url = find_pdb_link(html, job_url)
+            if pdb_url is not None:
+                return pdb_url
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"No Predict.pdb link at {job_url} after {timeout} s")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_delay)
+        instrumentation.count("rnacomposer_polls")
+        r = session.get(job_url, timeout=60)
+        r.raise_for_status()
+        html = r.text
+
+def download_pdb(session, pdb_url, out_path, timeout=60):
+    """
+    Download a PDB file through `session`. The file is written under a
+    temporary name first so an interrupted download never looks complete.
+    """
+    r = session.get(pdb_url, allow_redirects=True, timeout=timeout)
+    r.raise_for_status()
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".part"
+    with open(tmp_path, "wb") as f:
+        f.write(r.content)
+    os.replace(tmp_path, out_path)
+    instrumentation.count("bytes_downloaded", len(r.content))
+    return out_path
+
+def compose_one(session, rc_input, out_path, base_url=RNACOMPOSER_URL, timeout=600,
+                cache=None, **poll_kwargs):
+    """
+    Submit one RNAComposer job, wait for it and download the model to out_path.
+    If `cache` (a model_cache.ModelCache) already holds a model for rc_input it
+    is used without any network work; new models are added to it.
+    """
+    if cache is not None and cache.get(rc_input, out_path) is not None:
+        instrumentation.count("model_cache_hits")
+        return out_path
+    candidate = os.path.basename(out_path)
+    with instrumentation.span("rnacomposer.submit", candidate=candidate):
+        job_url, html = submit_job(session, rc_input, base_url)
+    with instrumentation.span("rnacomposer.wait", candidate=candidate):
+        pdb_url = wait_for_pdb_url(session, job_url, html, timeout=timeout, **poll_kwargs)
+    with instrumentation.span("pdb_download", candidate=candidate):
+        download_pdb(session, pdb_url, out_path)
+    if cache is not None:
+        cache.put(rc_input, out_path)
+    return out_path
+
+# =========================
+# 4. Concurrent submission
+# =========================
+
+def compose_pdbs(rc_inputs, out_dir="pdb_files", max_in_flight=4, base_url=RNACOMPOSER_URL,
+                 session=None, timeout=600, start_index=1, cache=None, **poll_kwargs):
+    """
+    Submit many RNAComposer inputs with at most `max_in_flight` jobs running
+    at once, and yield (index, pdb_path) as each job completes.
+
+    Args:
+        rc_inputs: iterable of strings from write_rnacomposer_input()
+        out_dir (str): where new_RNA_{index}.pdb files are written
+        max_in_flight (int): upper bound on concurrent jobs
+        base_url (str): RNAComposer address (point it at a local stand-in for tests)
+        session: requests session to reuse (default: the shared pooled session)
+        timeout (float): per-job limit in seconds
+        start_index (int): index of the first input
+        cache: optional model_cache.ModelCache; hits are yielded without any
+            network work and new models are stored in it
+
+    A job that fails or times out yields (index, None) instead of stopping the batch.
+    """
+    if session is None:
+        session = get_session()
+    pending = iter(enumerate(rc_inputs, start=start_index))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        running = {}
+
+        def fill():
+            while len(running) < max_in_flight:
+                item = next(pending, None)
+                if item is None:
+                    return
+                index, rc_input = item
+                out_path = os.path.join(out_dir, f"new_RNA_{index}.pdb")
+                future = pool.submit(compose_one, session, rc_input, out_path,
+                                     base_url, timeout, cache, **poll_kwargs)
+                running[future] = index
+
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    path = future.result()
+                except Exception as e:
+                    print(f"RNAComposer job {index} failed: {e}")
+                    instrumentation.count("rnacomposer_failures")
+                    path = None
+                yield index, path
+            fill()
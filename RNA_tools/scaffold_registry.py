@@ -0,0 +1,323 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+
+from pair_tables import pair_table, hairpin_loops
+
+# Directory for the default registry's compiled scaffolds; unset keeps them in memory only
+CACHE_DIR_ENV = "RNA_TOOLS_SCAFFOLD_CACHE"
+
+# Extra scaffold definitions (files or directories, separated by os.pathsep) for the default registry
+SCAFFOLDS_ENV = "RNA_TOOLS_SCAFFOLDS"
+
+# Bump when the compiled layout changes, so stale cache entries are ignored
+COMPILED_VERSION = 1
+
+TETRALOOPS = {
+    "GNRA": [["G"], ["A", "U", "G", "C"], ["A", "G"], ["A"]],
+    "UUCG": [["U"], ["U"], ["C"], ["G"]],
+}
+
+BASES = ["A", "U", "G", "C"]
+COMPLEMENT = {"A": "U", "U": "A", "G": "C", "C": "G"}
+
+# =========================
+# 1. Compiled scaffolds
+# =========================
+
+class CompiledScaffold:
+    """
+    Everything about a scaffold that does not depend on the random draw:
+    its pair table, hairpin loops, the kissing-loop pairings that fit those
+    loops, and constraint templates (fixed tetraloop bases per loop, aligned
+    position pairs per kissing pairing). sample() only fills in the random
+    choices.
+    """
+
+    def __init__(self, name, dot_bracket, pair_table, loops, kissing_patterns, tetraloops, kissing):
+        self.name = name
+        self.dot_bracket = dot_bracket
+        self.pair_table = pair_table
+        self.loops = loops
+        self.kissing_patterns = kissing_patterns
+        # {motif: {loop_idx: [(pos, allowed), ...]}}
+        self.tetraloops = tetraloops
+        # {(loop_a, loop_b): [(pos_a, pos_b), ...]}, loop_a < loop_b
+        self.kissing = kissing
+        self._templates = {}
+
+    @classmethod
+    def compile(cls, name, dot_bracket, kissing_patterns=None):
+        pt = pair_table(dot_bracket).tolist()
+        loops = hairpin_loops(dot_bracket)[0]
+        patterns = []
+        for pattern in kissing_patterns or []:
+            pattern = [tuple(sorted(pair)) for pair in pattern]
+            if any(b >= len(loops) for _, b in pattern):
+                raise ValueError(f"Scaffold {name}: kissing pattern {pattern} needs more than {len(loops)} loops")
+            patterns.append(pattern)
+
+        tetraloops = {motif: {} for motif in TETRALOOPS}
+        for loop_idx, (start, end) in enumerate(loops):
+            if end - start + 1 < 4:
+                continue
+            for motif, allowed in TETRALOOPS.items():
+                tetraloops[motif][loop_idx] = [(start + k, bases) for k, bases in enumerate(allowed)]
+
+        kissing = {}
+        for pattern in patterns:
+            for a, b in pattern:
+                (s1, e1), (s2, e2) = loops[a], loops[b]
+                length = min(e1 - s1 + 1, e2 - s2 + 1)
+                kissing[(a, b)] = [(s1 + k, s2 + k) for k in range(length)]
+        return cls(name, dot_bracket, pt, loops, patterns, tetraloops, kissing)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "dot_bracket": self.dot_bracket,
+            "pair_table": self.pair_table,
+            "loops": self.loops,
+            "kissing_patterns": self.kissing_patterns,
+            "tetraloops": {motif: [[idx, template] for idx, template in per_loop.items()]
+                           for motif, per_loop in self.tetraloops.items()},
+            "kissing": [[list(key), pairs] for key, pairs in self.kissing.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d["name"],
+            d["dot_bracket"],
+            d["pair_table"],
+            [tuple(loop) for loop in d["loops"]],
+            [[tuple(pair) for pair in pattern] for pattern in d["kissing_patterns"]],
+            {motif: {idx: [(pos, allowed) for pos, allowed in template] for idx, template in per_loop}
+             for motif, per_loop in d["tetraloops"].items()},
+            {tuple(key): [tuple(pair) for pair in pairs] for key, pairs in d["kissing"]},
+        )
+
+    def sample(self, rng=None):
+        """
+        Draw a motif configuration and fill the templates.
+        Loops in the chosen kissing pattern kiss, every other loop gets a
+        GNRA or UUCG tetraloop; kissing loops get a random sequence and its
+        reverse complement. Same output format as sample_motif_configuration
+        and motifs_to_constraints.
+        Returns (motif_cfg, constraints, annotation).
+        """
+        if rng is None:
+            rng = random.Random()
+        pattern = []
+        if self.kissing_patterns:
+            pattern = self.kissing_patterns[0] if len(self.kissing_patterns) == 1 else rng.choice(self.kissing_patterns)
+        kissing = {i for pair in pattern for i in pair}
+        tetraloops = [rng.choice(list(TETRALOOPS)) for i in range(len(self.loops)) if i not in kissing]
+        config = self._configuration(pattern, tetraloops)
+        return (config,) + self.fill(config, rng)
+
+    def _configuration(self, pattern, tetraloops):
+        # motif config with `pattern` kissing and the other loops labelled in order from `tetraloops`
+        config = {}
+        labels = iter(tetraloops)
+        partner = {a: b for pair in pattern for a, b in (pair, pair[::-1])}
+        for i in range(len(self.loops)):
+            config[i] = {"type": "kissing", "pair_with": partner[i]} if i in partner else {"type": next(labels)}
+        return config
+
+    def configurations(self):
+        """
+        Every distinct motif configuration: each kissing pattern (none if the
+        scaffold has no patterns) combined with each GNRA/UUCG labelling of
+        the remaining loops. Configurations that give the same constraint
+        template (e.g. different labels on loops too short for a tetraloop)
+        are listed once.
+        """
+        configs = []
+        seen = set()
+        for pattern in self.kissing_patterns or [[]]:
+            kissing = {i for pair in pattern for i in pair}
+            free = len(self.loops) - len(kissing)
+            for tetraloops in itertools.product(list(TETRALOOPS), repeat=free):
+                config = self._configuration(pattern, tetraloops)
+                key = self.template_key(config)
+                if key not in seen:
+                    seen.add(key)
+                    configs.append(config)
+        return configs
+
+    def template_key(self, config):
+        """
+        Hashable form of the constraint template of a configuration: the
+        fixed tetraloop positions and bases plus the kissing position pairs.
+        """
+        return self._template(config)[0]
+
+    def _template(self, config):
+        # memoized per configuration: (key, fixed constraints, annotation, kissing pairs)
+        cache_key = tuple((i, m["type"], m.get("pair_with")) for i, m in sorted(config.items()))
+        template = self._templates.get(cache_key)
+        if template is not None:
+            return template
+        fixed = {}
+        annotation = [None] * len(self.dot_bracket)
+        for i, motif in config.items():
+            for pos, allowed in self.tetraloops.get(motif["type"], {}).get(i, []):
+                fixed[pos] = list(allowed)
+                annotation[pos] = motif["type"]
+        kissing = []
+        for a, b in sorted({tuple(sorted((i, m["pair_with"]))) for i, m in config.items() if m["type"] == "kissing"}):
+            pairs = self.kissing[(a, b)]
+            kissing.append(pairs)
+            for pos1, pos2 in pairs:
+                annotation[pos1] = f"KL_{a}_{b}"
+                annotation[pos2] = f"KL_{b}_{a}"
+        key = (tuple(sorted((pos, tuple(allowed)) for pos, allowed in fixed.items())),
+               tuple(tuple(pairs) for pairs in kissing))
+        template = self._templates[cache_key] = (key, fixed, annotation, kissing)
+        return template
+
+    def fill(self, config, rng=None):
+        """
+        Constraints and annotation for a given configuration. The fixed part
+        comes from a memoized template; only the kissing-loop bases are drawn
+        from rng. Returns (constraints, annotation).
+        """
+        if rng is None:
+            rng = random.Random()
+        _, fixed, annotation, kissing = self._template(config)
+        constraints = {pos: list(allowed) for pos, allowed in fixed.items()}
+        for pairs in kissing:
+            seq1 = [rng.choice(BASES) for _ in pairs]
+            for (pos1, pos2), base, partner in zip(pairs, seq1, reversed(seq1)):
+                constraints[pos1] = [base]
+                constraints[pos2] = [COMPLEMENT[partner]]
+        return constraints, list(annotation)
+
+# =========================
+# 2. Registry
+# =========================
+
+class ScaffoldRegistry:
+    """
+    Named scaffold definitions, compiled on first use.
+
+    Definitions are added in code or loaded from JSON: a file maps names to
+    either a dot-bracket string or {"dot_bracket": ..., "kissing_patterns":
+    [[[0, 1], [2, 3]], ...]} (loop indices of the loops that may kiss; one
+    pattern is drawn per design run). A directory is read file by file.
+
+    Compiled forms are kept in memory and, if `cache_dir` is set, as JSON
+    files keyed by the SHA-256 of the definition, so later runs skip the
+    preprocessing.
+
+    Args:
+        cache_dir (str): directory for compiled scaffolds, or None for memory only
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._definitions = {}
+        self._compiled = {}
+        self.compiled = 0
+        self.loaded = 0
+
+    def add(self, name, dot_bracket, kissing_patterns=None):
+        definition = {"dot_bracket": dot_bracket, "kissing_patterns": kissing_patterns or []}
+        if self._definitions.get(name) != definition:
+            self._definitions[name] = definition
+            self._compiled.pop(name, None)
+
+    def load(self, path):
+        """
+        Add every definition in a JSON file, or in all *.json files of a directory.
+        Returns the names added.
+        """
+        if os.path.isdir(path):
+            names = []
+            for entry in sorted(os.listdir(path)):
+                if entry.endswith(".json"):
+                    names += self.load(os.path.join(path, entry))
+            return names
+        with open(path) as f:
+            definitions = json.load(f)
+        for name, d in definitions.items():
+            if isinstance(d, str):
+                self.add(name, d)
+            else:
+                self.add(name, d["dot_bracket"], d.get("kissing_patterns"))
+        return list(definitions)
+
+    def names(self):
+        return list(self._definitions)
+
+    def __contains__(self, name):
+        return name in self._definitions
+
+    def __len__(self):
+        return len(self._definitions)
+
+    def _cache_path(self, name):
+        definition = self._definitions[name]
+        blob = json.dumps([COMPILED_VERSION, name, definition["dot_bracket"], definition["kissing_patterns"]])
+        return os.path.join(self.cache_dir, hashlib.sha256(blob.encode()).hexdigest() + ".json")
+
+    def get(self, name):
+        """
+        Return the CompiledScaffold for `name` (KeyError if unknown).
+        """
+        compiled = self._compiled.get(name)
+        if compiled is not None:
+            return compiled
+        definition = self._definitions[name]
+        path = self._cache_path(name) if self.cache_dir else None
+        if path is not None:
+            try:
+                with open(path) as f:
+                    compiled = CompiledScaffold.from_dict(json.load(f))
+                self.loaded += 1
+            except (OSError, ValueError, KeyError):
+                compiled = None
+        if compiled is None:
+            compiled = CompiledScaffold.compile(name, definition["dot_bracket"], definition["kissing_patterns"])
+            self.compiled += 1
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.part"
+                with open(tmp_path, "w") as f:
+                    json.dump(compiled.to_dict(), f)
+                os.replace(tmp_path, path)
+        self._compiled[name] = compiled
+        return compiled
+
+    def compile_all(self):
+        """
+        Compile (or load) every registered scaffold up front.
+        """
+        return [self.get(name) for name in self._definitions]
+
+    def report(self):
+        print(f"Scaffold registry: {len(self)} scaffolds, {self.compiled} compiled, {self.loaded} loaded from cache")
+
+_default_registry = None
+
+def get_default_registry():
+    """
+    Return the process-wide registry: the built-in scaffolds of
+    create_rna_data plus any definitions named by RNA_TOOLS_SCAFFOLDS.
+    Compiled forms are cached on disk only if RNA_TOOLS_SCAFFOLD_CACHE
+    names a directory.
+    """
+    global _default_registry
+    if _default_registry is None:
+        import create_rna_data as cr
+
+        registry = ScaffoldRegistry(os.environ.get(CACHE_DIR_ENV) or None)
+        for name, dot_bracket in cr.scaffold.items():
+            registry.add(name, dot_bracket, cr.KISSING_PATTERNS.get(name))
+        for path in filter(None, os.environ.get(SCAFFOLDS_ENV, "").split(os.pathsep)):
+            registry.load(path)
+        _default_registry = registry
+    return _default_registry
@@ -0,0 +1,176 @@
+import re
+
+STANDARD_BASES = ("A", "U", "G", "C")
+
+# Quoted mmCIF values ('C1'' style atom names) or bare tokens
+_CIF_TOKEN = re.compile(r"'(?:[^']|'(?!\s|$))*'(?=\s|$)|\"(?:[^\"]|\"(?!\s|$))*\"(?=\s|$)|\S+")
+
+# =========================
+# 1. PDB
+# =========================
+
+def _pdb_sequences(file_path):
+    """
+    Stream ATOM/HETATM records of the first model and collect residue names per chain.
+    """
+    sequences = {}
+    seen = {}
+    with open(file_path) as f:
+        for line in f:
+            record = line[:6]
+            if record == "ENDMDL":
+                break
+            if record != "ATOM  " and record != "HETATM":
+                continue
+            resname = line[17:20].strip()
+            chain = line[21]
+            if chain not in sequences:
+                sequences[chain] = []
+                seen[chain] = set()
+            residue_id = (record, line[22:27])
+            if residue_id in seen[chain]:
+                continue
+            seen[chain].add(residue_id)
+            if resname in STANDARD_BASES:
+                sequences[chain].append(resname)
+    return {chain: "".join(bases) for chain, bases in sequences.items()}
+
+# =========================
+# 2. mmCIF
+# =========================
+
+def _cif_tokens(line):
+    if "'" not in line and '"' not in line:
+        return line.split()
+    return [t[1:-1] if t[0] in "'\"" else t for t in _CIF_TOKEN.findall(line)]
+
+def _atom_site_columns(columns, file_path):
+    index = {name: i for i, name in enumerate(columns)}
+    name_col = index.get("label_comp_id", index.get("auth_comp_id"))
+    chain_col = index.get("auth_asym_id", index.get("label_asym_id"))
+    seq_col = index.get("auth_seq_id", index.get("label_seq_id"))
+    if name_col is None or chain_col is None or seq_col is None:
+        raise ValueError(f"{file_path}: _atom_site loop lacks residue names, chains or numbers")
+    return (name_col, chain_col, seq_col, index.get("pdbx_PDB_ins_code"),
+            index.get("group_PDB"), index.get("pdbx_PDB_model_num"))
+
+def _cif_sequences(file_path):
+    """
+    Stream the _atom_site loop of an mmCIF file (first model only), reading
+    just the columns needed to list residues per chain. Chains and residue
+    numbers use the auth_* columns, as Biopython's MMCIFParser does.
+    """
+    sequences = {}
+    seen = {}
+    columns = []
+    in_loop = False
+    layout = None
+    pending = []
+    first_model = None
+
+    with open(file_path) as f:
+        for line in f:
+            if layout is None:
+                # still looking for the _atom_site loop header
+                if line.startswith("loop_"):
+                    in_loop = True
+                    columns = []
+                    continue
+                if in_loop and line.startswith("_atom_site."):
+                    columns.append(line.strip()[len("_atom_site."):])
+                    continue
+                if not (in_loop and columns and not line.startswith("_")):
+                    # header or data of another category; a data line ends its loop
+                    if not columns:
+                        in_loop = in_loop and line.startswith("_")
+                    continue
+                layout = _atom_site_columns(columns, file_path)
+                n_columns = len(columns)
+                name_col, chain_col, seq_col, icode_col, group_col, model_col = layout
+                # this line already holds the first row
+            elif line.startswith(("_", "loop_", "#", "data_")):
+                break
+
+            row = line.split()
+            if pending or len(row) != n_columns:
+                # quoted values with spaces, or a row split over several lines
+                pending.extend(_cif_tokens(line))
+                if len(pending) < n_columns:
+                    continue
+                row = pending[:n_columns]
+                del pending[:n_columns]
+
+            if model_col is not None:
+                if first_model is None:
+                    first_model = row[model_col]
+                elif row[model_col] != first_model:
+                    break
+            chain = row[chain_col]
+            if chain not in sequences:
+                sequences[chain] = []
+                seen[chain] = set()
+            residue_id = (row[group_col] if group_col is not None else "",
+                          row[seq_col],
+                          row[icode_col] if icode_col is not None else "")
+            if residue_id in seen[chain]:
+                continue
+            seen[chain].add(residue_id)
+            if row[name_col] in STANDARD_BASES:
+                sequences[chain].append(row[name_col])
+
+    if layout is None:
+        raise ValueError(f"{file_path}: no _atom_site loop found")
+    return {chain: "".join(bases) for chain, bases in sequences.items()}
+
+# =========================
+# 3. Other readers
+# =========================
+
+def _gemmi_sequences(file_path):
+    import gemmi
+
+    structure = gemmi.read_structure(file_path)
+    sequences = {}
+    for chain in structure[0]:
+        bases = [residue.name for residue in chain if residue.name in STANDARD_BASES]
+        sequences[chain.name] = sequences.get(chain.name, "") + "".join(bases)
+    return sequences
+
+def _biopython_sequences(file_path):
+    from Bio.PDB import MMCIFParser, PDBParser
+
+    parser = MMCIFParser(QUIET=True) if file_path.lower().endswith(".cif") else PDBParser(QUIET=True)
+    structure = parser.get_structure("RNA_structure", file_path)
+    sequences = {}
+    for chain in next(structure.get_models()):
+        sequences[chain.id] = "".join(
+            residue.get_resname().strip() for residue in chain.get_residues()
+            if residue.get_resname().strip() in STANDARD_BASES
+        )
+    return sequences
+
+READERS = {
+    "stream": lambda path: _cif_sequences(path) if path.lower().endswith(".cif") else _pdb_sequences(path),
+    "gemmi": _gemmi_sequences,
+    "biopython": _biopython_sequences,
+}
+
+def extract_chain_sequences(file_path, method="stream"):
+    """
+    Return {chain_id: sequence} of standard nucleotides (A/U/G/C) for the
+    first model of a .pdb or .cif file, in file order. Chains without any
+    standard nucleotide map to "".
+
+    Args:
+        file_path (str): Path to PDB or CIF structure file
+        method (str): "stream" reads only the coordinate records line by line
+            and falls back to Biopython if the file cannot be read that way;
+            "gemmi" and "biopython" build a full structure with that library.
+    """
+    if method != "stream":
+        return READERS[method](file_path)
+    try:
+        return READERS["stream"](file_path)
+    except (ValueError, IndexError, UnicodeDecodeError) as e:
+        print(f"Streaming reader failed on {file_path} ({e}), falling back to Biopython")
+        return _biopython_sequences(file_path)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of RNA_tools are imported by plain name, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
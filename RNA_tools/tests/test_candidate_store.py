@@ -0,0 +1,31 @@
+from candidate_store import CandidateStore
+
+MOTIFS = {0: {"type": "kissing", "pair_with": 1}, 1: {"type": "kissing", "pair_with": 0}, 2: {"type": "GNRA"}}
+
+def make_candidates():
+    return [
+        {"sequence": seq, "predicted_ss": "((....))", "target_ss": "((....))", "mfe": mfe, "bp_distance": distance,
+         "motifs": MOTIFS, "annotation": [None] * 8, "motifs_intact": True}
+        for seq, mfe, distance in [("GGAAACCC", -1.5, 0), ("GCAAAAGC", -0.75, 2)]
+    ]
+
+def test_add_candidates_run_is_idempotent(tmp_path):
+    path = str(tmp_path / "designs.rcs")
+    with CandidateStore(path) as store:
+        groups = store.add_candidates("z", make_candidates(), run="z/seed1_n2")
+    with CandidateStore(path) as store:
+        assert store.add_candidates("z", make_candidates(), run="z/seed1_n2") == groups
+        assert len(store) == 2 and len(store.groups) == 1
+        assert store.runs() == {"z/seed1_n2"}
+
+def test_get_returns_what_was_written(tmp_path):
+    path = str(tmp_path / "designs.rcs")
+    candidates = make_candidates()
+    with CandidateStore(path) as store:
+        store.add_candidates("z", candidates)
+        written = store.get(range(len(candidates)))
+    with CandidateStore(path) as store:
+        reopened = store.get(range(len(candidates)))
+    expected = [dict(c, scaffold="z") for c in candidates]
+    assert written == expected
+    assert reopened == expected
@@ -0,0 +1,19 @@
+import multiprocessing
+
+import pytest
+
+from ensemble_filter import EnsembleFilter
+
+TARGET = "((((....))))..((((....))))"
+
+def make_candidates():
+    sequences = ["GGGGAAACCCCAAGCGCGAAAGCGCA", "GCGCAAAGCGCAAGGGGAAACCCCAA", "AUAUGAAAAUAUAAGCGCUUCGGCGC"]
+    return [{"sequence": s, "target_ss": TARGET} for s in sequences]
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_stream_scores_like_score(workers):
+    expected = EnsembleFilter().score(make_candidates())
+    ef = EnsembleFilter(workers=workers)
+    streamed = list(ef.stream(iter(make_candidates()), mp_context=multiprocessing.get_context("spawn")))
+    assert sorted(streamed, key=lambda c: c["sequence"]) == sorted(expected, key=lambda c: c["sequence"])
+    assert ef.report()["scored"] == len(expected)
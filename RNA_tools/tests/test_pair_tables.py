@@ -0,0 +1,33 @@
+import random
+
+import pytest
+import RNA
+
+from create_rna_data import find_hairpin_loops, scaffold
+from pair_tables import base_pairs, hairpin_loops, pair_table, pair_tables
+
+def random_folds(n=200, length=88, seed=0):
+    rng = random.Random(seed)
+    return [RNA.fold("".join(rng.choice("AUGC") for _ in range(length)))[0] for _ in range(n)]
+
+def test_pair_table_matches_ptable():
+    for s in random_folds() + list(scaffold.values()):
+        assert pair_table(s).tolist() == [p - 1 for p in RNA.ptable(s)[1:]]
+
+def test_pair_tables_batch_matches_single():
+    # many short rows take the column sweep, few long ones the sorted matching
+    structures = random_folds(n=300, length=60)
+    assert pair_tables(structures).tolist() == [pair_table(s).tolist() for s in structures]
+
+def test_base_pairs():
+    s = "((..((...))..))."
+    assert base_pairs(s).tolist() == [[0, 14], [1, 13], [4, 10], [5, 9]]
+
+def test_unbalanced_brackets():
+    with pytest.raises(ValueError):
+        pair_table("((..)")
+
+def test_hairpin_loops_match_find_hairpin_loops():
+    structures = random_folds() + list(scaffold.values())
+    assert hairpin_loops(structures) == [find_hairpin_loops(s) for s in structures]
+    assert hairpin_loops("(((...)))..((..))") == [[(3, 5), (13, 14)]]
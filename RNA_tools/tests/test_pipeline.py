@@ -0,0 +1,18 @@
+import os
+
+import fold_service
+import pipeline
+from fake_rnacomposer import FakeRNAComposer
+
+def test_pipeline_without_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folded = sum(fold_service.get_fold_policy().used.values())
+    with FakeRNAComposer(delay=0.1) as server:
+        result = pipeline.run_pipeline("z_tile_tetramer", n_candidates=2, analysis_workers=1,
+                                       base_url=server.url, cache=False)
+    assert len(result["records"]) == 2
+    assert all(record["error"] is None for record in result["records"])
+    assert result["best"] is not None
+    assert not os.path.exists("model_cache")
+    # the analysis workers' fold modes are counted in this process
+    assert sum(fold_service.get_fold_policy().used.values()) == folded + 2
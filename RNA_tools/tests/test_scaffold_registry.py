@@ -0,0 +1,30 @@
+import os
+import random
+
+import create_rna_data as cr
+from scaffold_registry import ScaffoldRegistry
+
+def test_registry_writes_nothing_without_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    registry = ScaffoldRegistry()
+    registry.add("z", cr.scaffold["z_tile_tetramer"], cr.KISSING_PATTERNS["z_tile_tetramer"])
+    registry.get("z").sample(random.Random(0))
+    assert os.listdir(tmp_path) == []
+
+def test_registry_cache_dir_round_trip(tmp_path):
+    first = ScaffoldRegistry(str(tmp_path))
+    first.add("z", cr.scaffold["z_tile_tetramer"], cr.KISSING_PATTERNS["z_tile_tetramer"])
+    second = ScaffoldRegistry(str(tmp_path))
+    second.add("z", cr.scaffold["z_tile_tetramer"], cr.KISSING_PATTERNS["z_tile_tetramer"])
+    assert first.get("z").to_dict() == second.get("z").to_dict()
+    assert (first.compiled, second.loaded) == (1, 1)
+
+def test_sample_motif_configuration_honours_loops():
+    loops = cr.find_hairpin_loops("((((....))))..((((....))))")
+    config = cr.sample_motif_configuration("unregistered", loops, random.Random(0))
+    assert sorted(config) == [0, 1]
+    assert all(motif["type"] in ("GNRA", "UUCG") for motif in config.values())
+
+    # the prism's patterns need six loops: two loops get tetraloops only
+    config = cr.sample_motif_configuration("triangular_prism", loops, random.Random(0))
+    assert all(motif["type"] != "kissing" for motif in config.values())
@@ -0,0 +1,207 @@
+"""
+Shared pool of browser sessions for the Selenium paths (RNAComposer form
+submission in create_pdb_from_RNAComposer, Mol*Star in rna_visualizer).
+
+Starting Chrome takes seconds and a few hundred MB per window, so sessions
+are started once and handed out again:
+
+    pool = get_default_pool()
+    with pool.session() as driver:
+        driver.get(url)
+        ...
+
+Each session is health-checked when it is handed out and replaced if it
+has crashed, and reset (cookies cleared, blank page) when it comes back.
+A session whose reset fails is quit and replaced on the next request.
+"""
+import atexit
+import contextlib
+import os
+import threading
+
+import instrumentation
+
+# Number of browser sessions kept by the default pool; RNA_TOOLS_BROWSERS overrides it
+DEFAULT_POOL_SIZE = 2
+POOL_SIZE_ENV = "RNA_TOOLS_BROWSERS"
+
+# Set to 1 in containers / CI, where Chrome's sandbox and GPU are unavailable
+CONTAINER_ENV = "RNA_TOOLS_CHROME_CONTAINER"
+
+BLANK_PAGE = "about:blank"
+
+def chrome(headless=True, sandbox=None, gpu=None):
+    """
+    Start a Chrome session, headless by default.
+
+    Args:
+        headless (bool): no window on screen
+        sandbox (bool): keep Chrome's sandbox; False adds --no-sandbox
+        gpu (bool): keep GPU acceleration; False adds --disable-gpu
+    Both default to on, unless RNA_TOOLS_CHROME_CONTAINER=1 turns them off.
+    """
+    # selenium is only loaded once a browser is actually needed
+    from selenium import webdriver
+
+    container = os.environ.get(CONTAINER_ENV) == "1"
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    if gpu is False or (gpu is None and container):
+        options.add_argument("--disable-gpu")
+    if sandbox is False or (sandbox is None and container):
+        options.add_argument("--no-sandbox")
+    return webdriver.Chrome(options=options)
+
+class DriverPool:
+    """
+    Up to `size` reusable WebDriver sessions.
+
+    Args:
+        size (int): most sessions alive at once; acquire() blocks when all are in use
+        factory: callable returning a new driver (default: chrome(headless))
+        headless (bool): passed to chrome() when no factory is given
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, factory=None, headless=True):
+        self.size = size
+        self.factory = factory or (lambda: chrome(headless))
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.started = 0
+        self.reused = 0
+        self.restarted = 0
+
+    def _start(self):
+        with instrumentation.span("browser.start"):
+            driver = self.factory()
+        with self._lock:
+            self.started += 1
+        return driver
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """
+        Hand out a working session, reusing an idle one when possible.
+        Raises TimeoutError if none is free within `timeout` seconds.
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser session free after {timeout} s")
+        try:
+            while True:
+                with self._lock:
+                    driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    return self._start()
+                if self._healthy(driver):
+                    with self._lock:
+                        self.reused += 1
+                    instrumentation.count("browser_reuses")
+                    return driver
+                # crashed while idle: drop it and try the next one
+                self._quit(driver)
+                with self._lock:
+                    self.restarted += 1
+                instrumentation.count("browser_restarts")
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, driver, discard=False):
+        """
+        Return a session to the pool, reset for the next job. A session that
+        cannot be reset, or is discarded, is quit instead.
+        """
+        try:
+            if not discard and not self._closed:
+                try:
+                    driver.delete_all_cookies()
+                    driver.get(BLANK_PAGE)
+                except Exception:
+                    discard = True
+                    with self._lock:
+                        self.restarted += 1
+                    instrumentation.count("browser_restarts")
+            if discard or self._closed:
+                self._quit(driver)
+            else:
+                with self._lock:
+                    self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        """
+        Context manager around acquire() / release().
+        """
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def stats(self):
+        return {"size": self.size, "started": self.started, "reused": self.reused, "restarted": self.restarted,
+                "idle": len(self._idle)}
+
+    def close(self):
+        """
+        Quit every idle session; sessions still in use are quit when released.
+        """
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+# =========================
+# Shared default pool
+# =========================
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def get_default_pool():
+    """
+    Return the process-wide headless DriverPool (created on first use, with
+    RNA_TOOLS_BROWSERS sessions if that environment variable is set) and
+    quit its browsers at exit.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool(size=int(os.environ.get(POOL_SIZE_ENV, DEFAULT_POOL_SIZE)))
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+def configure(**kwargs):
+    """
+    Replace the process-wide DriverPool, e.g. configure(size=4) or
+    configure(factory=FakeMolstarDriver) for offline runs.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = DriverPool(**kwargs)
+        atexit.register(_default_pool.close)
+        return _default_pool